@@ -0,0 +1,271 @@
+import hashlib
+import inspect
+import os
+import pickle
+import re
+import sys
+import sysconfig
+import types
+
+import prefetch_modeler
+
+
+INSTALLED_PATHS = tuple({sysconfig.get_path(name)
+                         for name in ('stdlib', 'platstdlib', 'purelib',
+                                      'platlib')})
+
+
+class Fingerprint:
+    """
+    Describes classes, functions and values as text which only changes when
+    they would behave differently, for hashing.
+
+    A class is described by its source and that of its bases, and by their
+    attributes. A function is described by its code, by the values it closes
+    over, since bucket types are often made by factory functions, and by the
+    module level values its code refers to by name, such as helper functions.
+    Other definitions in the same modules, such as charts, are left out.
+    """
+
+    def __init__(self):
+        # Descriptions of classes and functions, by id, kept with the object
+        # so that the id is not reused
+        self.described = {}
+
+    def source(self, obj):
+        try:
+            return inspect.getsource(obj)
+        except (OSError, TypeError):
+            return None
+
+    def describe(self, value, seen=None):
+        seen = set() if seen is None else seen
+        if id(value) in seen:
+            return '<cycle>'
+
+        # Classes and functions are described by a hash of their description,
+        # which keeps descriptions which refer to them short
+        if isinstance(value, (type, types.FunctionType)):
+            if installed(value):
+                return f'<{value.__module__}.{value.__qualname__}>'
+            if id(value) not in self.described:
+                digest = hashlib.sha256(
+                    self._describe(value, seen).encode()).hexdigest()
+                self.described[id(value)] = (value, digest)
+            return self.described[id(value)][1]
+        return self._describe(value, seen)
+
+    def _describe(self, value, seen):
+        if isinstance(value, type):
+            seen = seen | {id(value)}
+            parts = []
+            for cls in value.__mro__:
+                if cls.__module__ == 'builtins' or \
+                        cls.__module__ == 'collections':
+                    continue
+                attributes = sorted(
+                    (name, self.describe(attr, seen))
+                    for name, attr in vars(cls).items()
+                    if name not in ('__dict__', '__weakref__', '__doc__')
+                )
+                parts.append((cls.__module__, cls.__qualname__,
+                              self.source(cls), attributes))
+            return repr(parts)
+
+        if isinstance(value, (staticmethod, classmethod)):
+            return self.describe(value.__func__, seen)
+
+        if isinstance(value, property):
+            return repr([self.describe(f, seen)
+                         for f in (value.fget, value.fset, value.fdel)])
+
+        if isinstance(value, types.MethodType):
+            return repr((self.describe(value.__func__, seen),
+                         self.describe(value.__self__, seen)))
+
+        if isinstance(value, types.FunctionType):
+            seen = seen | {id(value)}
+            closure = []
+            for cell in value.__closure__ or ():
+                try:
+                    contents = cell.cell_contents
+                except ValueError:
+                    # The variable has not been assigned yet
+                    continue
+                if contents is not value:
+                    closure.append(self.describe(contents, seen))
+            referenced = [
+                (name, self.describe(value.__globals__[name], seen))
+                for name in sorted(global_names(value.__code__))
+                if name in value.__globals__
+            ]
+            return repr((value.__module__, value.__qualname__,
+                         self.describe(value.__code__, seen),
+                         self.describe(value.__defaults__, seen), closure,
+                         referenced))
+
+        if isinstance(value, types.CodeType):
+            return repr((value.co_code.hex(), value.co_names,
+                         [self.describe(const, seen)
+                          for const in value.co_consts]))
+
+        if isinstance(value, (list, tuple)):
+            return repr([self.describe(item, seen) for item in value])
+
+        if isinstance(value, (set, frozenset)):
+            return repr(sorted(self.describe(item, seen) for item in value))
+
+        if isinstance(value, dict):
+            return repr(sorted((repr(k), self.describe(v, seen))
+                               for k, v in value.items()))
+
+        if isinstance(value, types.ModuleType):
+            # Modules outside the input file are imported, not defined there
+            return f'<module {value.__name__}>'
+
+        if isinstance(value, (type(None), bool, int, float, str, bytes)):
+            return repr(value)
+
+        if hasattr(value, '__dict__'):
+            seen = seen | {id(value)}
+            return repr((self.describe(type(value), seen),
+                         self.describe(vars(value), seen)))
+
+        # Without the addresses objects without a useful repr have
+        return re.sub(r' at 0x[0-9a-f]+', '', repr(value))
+
+
+def installed(obj):
+    """
+    Whether ``obj`` is defined by the standard library or an installed
+    package, which only change along with the environment.
+    """
+    module = sys.modules.get(obj.__module__)
+    if module is None:
+        return False
+    if obj.__module__.partition('.')[0] in sys.stdlib_module_names:
+        return True
+    path = getattr(module, '__file__', None)
+    return path is None or path.startswith(INSTALLED_PATHS)
+
+
+def global_names(code):
+    """The names ``code`` and the code nested in it look up, which include
+    the globals it uses."""
+    names = set(code.co_names)
+    for const in code.co_consts:
+        if isinstance(const, types.CodeType):
+            names |= global_names(const)
+    return names
+
+
+def package_version():
+    """A hash of the source of the prefetch_modeler package."""
+    digest = hashlib.sha256()
+    root = list(prefetch_modeler.__path__)[0]
+    for directory, _, files in sorted(os.walk(root)):
+        for name in sorted(files):
+            if name.endswith('.py'):
+                with open(os.path.join(directory, name), 'rb') as f:
+                    digest.update(name.encode())
+                    digest.update(f.read())
+    return digest.hexdigest()
+
+
+class ResultCache:
+    """
+    Metric samples and tracer data of simulation runs, stored in
+    ``directory`` under a hash of everything which determines them.
+
+    Once the stored results take up more than ``max_bytes``, the least
+    recently used are removed.
+    """
+
+    def __init__(self, directory, max_bytes=1024 * 1024 * 1024):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.fingerprint = Fingerprint()
+        self.version = package_version()
+        os.makedirs(directory, exist_ok=True)
+
+    def metric_id(self, metric):
+        # Metrics made by Simulation.metric() remember the sampling policy
+        # they were given, before they have changed its state
+        sampling = getattr(metric, 'key', (None, metric.sampling))[1]
+        return hashlib.sha256('\n'.join([
+            metric.name,
+            self.fingerprint.describe(type(metric)),
+            self.fingerprint.describe(sampling),
+        ]).encode()).hexdigest()
+
+    def key(self, simulation, volume, **kwargs):
+        """The key of the results of ``simulation.run(volume, **kwargs)``."""
+        description = '\n'.join([
+            self.version,
+            self.fingerprint.describe(list(simulation.schema)),
+            self.fingerprint.describe(simulation.cache),
+            self.fingerprint.describe(simulation.blocks),
+            repr(volume),
+            self.fingerprint.describe(kwargs),
+        ])
+        return hashlib.sha256(description.encode()).hexdigest()
+
+    def path(self, key):
+        return os.path.join(self.directory, f'{key}.pkl')
+
+    def load(self, simulation, key):
+        """
+        Restore the recorded samples of the metrics of ``simulation`` from the
+        results stored under ``key``. Return the stored results, or None
+        if there are none or they lack any of the metrics.
+        """
+        try:
+            with open(self.path(key), 'rb') as f:
+                results = pickle.load(f)
+        except (OSError, EOFError, pickle.UnpicklingError):
+            return None
+
+        recorders = results['recorders']
+        metric_ids = [self.metric_id(metric) for metric in simulation.metrics]
+        if any(metric_id not in recorders for metric_id in metric_ids):
+            return None
+
+        for metric, metric_id in zip(simulation.metrics, metric_ids):
+            metric.restore(recorders[metric_id])
+
+        # Mark the results as recently used
+        os.utime(self.path(key))
+        return results
+
+    def store(self, simulation, key, tracer_data=None, **summary):
+        """Store the samples recorded by the metrics of ``simulation``."""
+        results = {
+            'recorders': {self.metric_id(metric): metric.recorder
+                          for metric in simulation.metrics},
+            'tracer_data': tracer_data,
+            **summary,
+        }
+        path = self.path(key)
+        try:
+            with open(f'{path}.tmp', 'wb') as f:
+                pickle.dump(results, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(f'{path}.tmp', path)
+        finally:
+            if os.path.exists(f'{path}.tmp'):
+                os.remove(f'{path}.tmp')
+        self.evict()
+
+    def evict(self):
+        entries = []
+        for name in os.listdir(self.directory):
+            if not name.endswith('.pkl'):
+                continue
+            stat = os.stat(os.path.join(self.directory, name))
+            entries.append((stat.st_mtime, stat.st_size, name))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, name in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            os.remove(os.path.join(self.directory, name))
+            total -= size
@@ -50,7 +50,7 @@ class CDVariableHeadroom(Bucket):
         if time_elapsed == 0:
             raw_rate = 0
         else:
-            raw_rate = Fraction(number_moved, time_elapsed)
+            raw_rate = self.pipeline.numeric.quotient(number_moved, time_elapsed)
 
         return raw_rate
 
@@ -1,5 +1,5 @@
 from prefetch_modeler.core import Metric
-from numpy import mean, std
+from prefetch_modeler.core.aggregate import BucketAggregate, LogWindow
 
 
 
@@ -102,24 +102,24 @@ def in_storage(pipeline):
 
 @metric
 def io_ratio(pipeline):
-    latency = io_latency.function(pipeline)
+    latency = io_latency.value(pipeline)
     if latency is None or latency == 0:
         return None
-    return in_storage.function(pipeline) / latency
+    return in_storage.value(pipeline) / latency
 
 @metric
 def storage_latency_ratio(pipeline):
-    lchange = latency_change.function(pipeline)
+    lchange = latency_change.value(pipeline)
     if lchange is None or lchange == 0:
         return 0
-    srchange = storage_rate_change.function(pipeline)
+    srchange = storage_rate_change.value(pipeline)
     if srchange == 0:
         return 0
     return srchange / lchange
 
 @metric
 def storage_latency_ratio2(pipeline):
-    latency = io_latency.function(pipeline)
+    latency = io_latency.value(pipeline)
     if latency is None or latency == 0:
         return None
     completed_rate = pipeline['ratelimiter'].raw_storage_rate
@@ -129,6 +129,18 @@ def storage_latency_ratio2(pipeline):
 def completed_not_consumed(pipeline):
     return len(pipeline['completed'])
 
+@metric
+def reorder_depth(pipeline):
+    return pipeline['enforcer'].depth
+
+@metric
+def max_reorder_depth(pipeline):
+    return pipeline['enforcer'].max_depth
+
+@metric
+def mean_reorder_depth(pipeline):
+    return float(pipeline['enforcer'].mean_depth)
+
 @metric
 def modified_cnc(pipeline):
     return pipeline['cd_fetcher'].completed
@@ -285,11 +297,14 @@ def awd_integral_term_w_coefficient(pipeline):
 
 @metric
 def avg_total_latency_completed_ios(pipeline):
-    real_ios = [io for io in pipeline['completed'] if getattr(io, 'cached', None) is None]
-    if not real_ios:
-        return None
-    completion_latencies = [io.completion_time - io.submission_time for io in real_ios]
-    return mean(completion_latencies)
+    def completion_latency(io):
+        if getattr(io, 'cached', None) is not None:
+            return None
+        return io.completion_time - io.submission_time
+
+    completed = pipeline['completed']
+    return pipeline.aggregate('completion_latency',
+        lambda: BucketAggregate(completed, completion_latency)).mean
 
 @metric
 def completions(pipeline):
@@ -337,33 +352,44 @@ def wait_benefit_dt(pipeline):
 def latency_cost_dt(pipeline):
     return pipeline['cd_fetcher'].info.get('latency_cost_dt', None)
 
+def consumed_mean(pipeline, name, key):
+    """
+    The mean of ``key(io)`` over the last prefetch distance worth of consumed
+    IOs, leaving out those for which it returns None.
+    """
+    fetcher = pipeline['cd_fetcher']
+    window = pipeline.aggregate(name, lambda: LogWindow(fetcher.consume_log, key))
+    return window.mean(int(fetcher.prefetch_distance))
+
+def consumed_latency(io):
+    if getattr(io, 'cached', False):
+        return None
+    return io.completion_time - io.submission_time
+
+def consumed_throughput(io):
+    if getattr(io, 'cached', False):
+        return None
+    return io.prefetch_distance / (io.completion_time - io.submission_time)
+
 @metric
 def latency(pipeline):
-    prefetch_distance = pipeline['cd_fetcher'].prefetch_distance
     if not pipeline['cd_fetcher'].consume_log:
         return None
-    ios = list(reversed(pipeline['cd_fetcher'].consume_log))[:int(prefetch_distance)]
-    return mean([io.completion_time - io.submission_time for io in ios if not
-        getattr(io, 'cached', False)])
+    return consumed_mean(pipeline, 'consumed_latency', consumed_latency)
 
 @metric
 def through(pipeline):
-    prefetch_distance = pipeline['cd_fetcher'].prefetch_distance
     if not pipeline['cd_fetcher'].consume_log:
         return None
-    ios = list(reversed(pipeline['cd_fetcher'].consume_log))[:int(prefetch_distance)]
-    return mean([io.prefetch_distance / (io.completion_time -
-        io.submission_time) for io in ios if not getattr(io, "cached", False)])
+    return consumed_mean(pipeline, 'consumed_throughput', consumed_throughput)
 
 @metric
 def avg_tput_avg_pfd(pipeline):
-    prefetch_distance = pipeline['cd_fetcher'].prefetch_distance
     if not pipeline['cd_fetcher'].consume_log:
         return None
-    ios = list(reversed(pipeline['cd_fetcher'].consume_log))[:int(prefetch_distance)]
-    avg_tput = mean([io.prefetch_distance / (io.completion_time -
-        io.submission_time) for io in ios if not getattr(io, "cached", False)])
-    avg_pfd = mean([io.prefetch_distance for io in ios])
+    avg_tput = consumed_mean(pipeline, 'consumed_throughput', consumed_throughput)
+    avg_pfd = consumed_mean(pipeline, 'consumed_prefetch_distance',
+                            lambda io: io.prefetch_distance)
     return avg_tput / avg_pfd
 
 # @metric
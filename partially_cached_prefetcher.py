@@ -70,7 +70,7 @@ class PartiallyCachedPIPrefetcher(RateBucket):
             target = self.target
             if getattr(io, 'cached', None):
                 target = self.pipeline['completed']
-                self.volume += 1
+                self.volume += self.pipeline.numeric.scale
                 cached_blocks_moved += 1
             else:
                 target = self.target
@@ -123,7 +123,7 @@ class PartiallyCachedPIPrefetcher(RateBucket):
         if time_elapsed == 0:
             raw_rate = 0
         else:
-            raw_rate = Fraction(number_moved, time_elapsed)
+            raw_rate = self.pipeline.numeric.quotient(number_moved, time_elapsed)
 
         return raw_rate
 
@@ -146,7 +146,7 @@ class PartiallyCachedPIPrefetcher(RateBucket):
 
         total = sum([item.raw_demand_rate for item in itertools.islice(
             reversed(usable_demand_rate_log), self.avg_lookback)])
-        return Fraction(total, self.avg_lookback)
+        return self.pipeline.numeric.quotient(total, self.avg_lookback)
 
     @property
     def proportional_term(self):
@@ -1,4 +1,5 @@
 import matplotlib.pyplot as plt
+import numpy as np
 import pandas as pd
 import math
 
@@ -21,10 +22,7 @@ class MetaChartGroup(type):
 class ChartGroup:
     def __init__(self, simulation):
         self.simulation = simulation
-        self.charts = [chart() for chart in self._charts]
-
-        for chart in self.charts:
-            chart.attach(self.simulation)
+        self.charts = [chart(self.simulation) for chart in self._charts]
 
     @property
     def title(self):
@@ -121,9 +119,35 @@ class Limit:
         return limit
 
 
-def ChartType(*args, plot_type='line', **kwargs):
+def downsample(series, lower, upper, bins):
+    """
+    Reduce ``series`` to the first, last, minimum and maximum point in each of
+    ``bins`` equal ranges of ticks between ``lower`` and ``upper``, which is
+    enough to draw it the same at a resolution of ``bins`` pixels.
+    """
+    if len(series) <= 4 * bins or upper <= lower:
+        return series
+
+    x = series.index.to_numpy(dtype=np.float64)
+    y = series.to_numpy(dtype=np.float64, na_value=np.nan)
+    bin_of = np.minimum(((x - lower) * bins / (upper - lower)).astype(np.int64),
+                        bins - 1)
+
+    first = np.flatnonzero(np.diff(bin_of, prepend=-1))
+    last = np.append(first[1:] - 1, len(x) - 1)
+    # Missing values sort last when looking for the minimum and first when
+    # looking for the maximum, so are only chosen for bins with no values
+    by_min = np.lexsort((np.where(np.isnan(y), np.inf, y), bin_of))
+    by_max = np.lexsort((np.where(np.isnan(y), -np.inf, y), bin_of))
+
+    keep = np.unique(np.concatenate((first, last, by_min[first], by_max[last])))
+    return series.iloc[keep]
+
+
+def ChartType(*args, plot_type='line', sampling=None, **kwargs):
     class chart_type(Chart):
         _plot_type = plot_type
+        _sampling = sampling
         _kwargs = kwargs
         _metric_schema = {metric_type.__name__ : metric_type for metric_type in args}
 
@@ -132,16 +156,26 @@ def ChartType(*args, plot_type='line', **kwargs):
 class Chart:
     name = None
     _plot_type = 'line'
+    _sampling = None
     _metric_schema = {}
     _kwargs = {}
 
-    def __init__(self):
+    def __init__(self, simulation=None):
         if not self._metric_schema:
             raise Exception("Chart must have metrics")
 
-        self.metric_schema = {
-            metric_name: metric_type() for metric_name, metric_type in self._metric_schema.items()
-        }
+        # Charts of the same simulation which show the same metric with the
+        # same sampling share one Metric, so it is only recorded once
+        if simulation is None:
+            self.metric_schema = {
+                metric_name: metric_type(sampling=self._sampling)
+                for metric_name, metric_type in self._metric_schema.items()
+            }
+        else:
+            self.metric_schema = {
+                metric_name: simulation.metric(metric_type, self._sampling)
+                for metric_name, metric_type in self._metric_schema.items()
+            }
         self._data = None
 
     @property
@@ -152,16 +186,12 @@ class Chart:
     def plot_type(self):
         return self._plot_type
 
-    def attach(self, simulation):
-        simulation.metrics.extend(self.metric_schema.values())
-
     @property
     def data(self):
         if self._data is None:
-            data = pd.DataFrame()
-            for metric in self.metric_schema.values():
-                data = data.join(metric.data, how='outer')
-            self._data = data
+            self._data = pd.concat(
+                [metric.data for metric in self.metric_schema.values()],
+                axis='columns', join='outer', sort=True)
         return self._data
 
     @property
@@ -181,9 +211,28 @@ class Chart:
 
 
     def plot(self, ax):
-        metric_data = self.data
-        metric_data = metric_data.reindex(metric_data.index.union(metric_data.index[1:] - 1), method='ffill')
-
-        columns = self.metric_schema.keys()
-        getattr(metric_data.plot, self.plot_type)(y=columns, ax=ax, **self.kwargs)
+        data = self.data
+        columns = list(self.metric_schema.keys())
+
+        # Metrics hold their value until the next sample, so downsample them
+        # separately and carry their values forward onto the combined ticks
+        bins = max(1, int(ax.get_window_extent().width))
+        lower, upper = data.index.min(), data.index.max()
+        series = [downsample(data[column], lower, upper, bins)
+                  for column in columns]
+        index = series[0].index
+        for column in series[1:]:
+            index = index.union(column.index)
+        metric_data = pd.DataFrame({
+            column: values.reindex(index, method='ffill')
+            for column, values in zip(columns, series)
+        })
+
+        kwargs = dict(self.kwargs)
+        if self.plot_type == 'line':
+            kwargs.setdefault('drawstyle', 'steps-post')
+        else:
+            metric_data = metric_data.reindex(metric_data.index.union(metric_data.index[1:] - 1), method='ffill')
+
+        getattr(metric_data.plot, self.plot_type)(y=columns, ax=ax, **kwargs)
 
@@ -1,10 +1,21 @@
-__all__ = ('IO', 'Tracer', 'Pipeline', 'Bucket', 'GateBucket', 'DialBucket',
+__all__ = ('IO', 'Tracer', 'Pipeline', 'Bucket', 'Peer', 'GateBucket', 'DialBucket',
            'ContinueBucket', 'StopBucket', 'RateBucket', 'ThresholdBucket',
            'CapacityBucket', 'TargetCapacityBucket', 'GlobalCapacityBucket',
-           'Simulation')
+           'Simulation', 'Numeric', 'FloatNumeric', 'FixedPointNumeric',
+           'ValidatedNumeric',
+           'Sampling', 'EveryN', 'OnChange', 'Decimate', 'CacheModel',
+           'EveryOther', 'BufferPool', 'ClockSweep', 'LRU', 'BlockTrace',
+           'RecordedCache')
 
 from prefetch_modeler.core.io import IO, Tracer
-from prefetch_modeler.core.bucket import Pipeline, Bucket
+from prefetch_modeler.core.numeric import Numeric, FloatNumeric, \
+    FixedPointNumeric, ValidatedNumeric
+from prefetch_modeler.core.sampling import Sampling, EveryN, OnChange, \
+    Decimate
+from prefetch_modeler.core.buffer_pool import CacheModel, EveryOther, \
+    BufferPool, ClockSweep, LRU
+from prefetch_modeler.core.block_trace import BlockTrace, RecordedCache
+from prefetch_modeler.core.bucket import Pipeline, Bucket, Peer
 from prefetch_modeler.core.bucket_type import GateBucket, DialBucket, \
     ContinueBucket, StopBucket, RateBucket, ThresholdBucket, CapacityBucket, \
     TargetCapacityBucket, TargetGroupCapacityBucket, GlobalCapacityBucket, \
@@ -0,0 +1,120 @@
+import heapq
+import math
+
+
+class BucketAggregate:
+    """
+    The count, sum, minimum and maximum of ``key(io)`` over the IOs in a
+    bucket, kept up to date as IOs are added and removed.
+
+    ``key`` is called the first time the aggregate is read after an IO has
+    been added, since the attributes it reads may be set after the IO arrives
+    -- by a reaction, for example. They must not change after that while the
+    IO stays in the bucket. IOs for which ``key`` returns None are left out.
+    """
+
+    def __init__(self, bucket, key):
+        self.key = key
+        self.pending = dict.fromkeys(bucket)
+        self.values = {}
+        self.count = 0
+        self.total = 0
+        self.sequence = 0
+
+        # Entries of (value, sequence, io), removed lazily. The maximum heap
+        # holds negated values.
+        self.min_heap = []
+        self.max_heap = []
+
+        bucket.aggregates.append(self)
+
+    def add(self, io):
+        self.pending[io] = None
+
+    def remove(self, io):
+        if self.pending.pop(io, True) is None:
+            return
+        entry = self.values.pop(io, None)
+        if entry is not None:
+            self.count -= 1
+            self.total -= entry[0]
+
+    def refresh(self):
+        for io in self.pending:
+            value = self.key(io)
+            if value is None:
+                continue
+            self.sequence += 1
+            self.values[io] = (value, self.sequence)
+            self.count += 1
+            self.total += value
+            heapq.heappush(self.min_heap, (value, self.sequence, io))
+            heapq.heappush(self.max_heap, (-value, self.sequence, io))
+        self.pending.clear()
+
+    def _is_current(self, io, sequence):
+        entry = self.values.get(io)
+        return entry is not None and entry[1] == sequence
+
+    @property
+    def mean(self):
+        self.refresh()
+        if not self.count:
+            return None
+        return self.total / self.count
+
+    @property
+    def minimum(self):
+        self.refresh()
+        heap = self.min_heap
+        while heap and not self._is_current(heap[0][2], heap[0][1]):
+            heapq.heappop(heap)
+        return heap[0][0] if heap else None
+
+    @property
+    def maximum(self):
+        self.refresh()
+        heap = self.max_heap
+        while heap and not self._is_current(heap[0][2], heap[0][1]):
+            heapq.heappop(heap)
+        return -heap[0][0] if heap else None
+
+
+class LogWindow:
+    """
+    Sums of ``key(entry)`` over the last n entries of an append-only ``log``,
+    for any n, in constant time.
+
+    Entries are folded into prefix sums when the window is next read. Entries
+    for which ``key`` returns None are left out of the sum and the count.
+    """
+
+    def __init__(self, log, key):
+        self.log = log
+        self.key = key
+        self.sums = [0]
+        self.counts = [0]
+
+    def refresh(self):
+        for entry in self.log[len(self.sums) - 1:]:
+            value = self.key(entry)
+            if value is None:
+                self.sums.append(self.sums[-1])
+                self.counts.append(self.counts[-1])
+            else:
+                self.sums.append(self.sums[-1] + value)
+                self.counts.append(self.counts[-1] + 1)
+
+    def window(self, n):
+        """Return the count and sum over the last ``n`` entries."""
+        self.refresh()
+        start = max(0, len(self.sums) - 1 - max(0, n))
+        return (self.counts[-1] - self.counts[start],
+                self.sums[-1] - self.sums[start])
+
+    def mean(self, n):
+        """The mean over the last ``n`` entries, or NaN if there are none."""
+        count, total = self.window(n)
+        if not count:
+            return math.nan
+        return total / count
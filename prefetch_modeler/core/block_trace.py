@@ -0,0 +1,107 @@
+import os
+
+import numpy as np
+
+from prefetch_modeler.core.buffer_pool import CacheModel
+
+
+# The block number, the timestamp in microseconds and whether the read was a
+# hit, packed without padding
+TRACE_DTYPE = np.dtype([('block', '<i8'), ('timestamp', '<i8'),
+                        ('cached', '?')])
+
+
+class BlockTrace:
+    """
+    A recorded sequence of block reads, stored as rows of `TRACE_DTYPE` in the
+    binary file at ``path``.
+
+    The file is memory-mapped and read ``chunk_size`` rows at a time, so a
+    trace need not fit in memory. Use `blocks` as the ``blocks`` of a
+    `Simulation` to read the blocks in the recorded order, `RecordedCache` to
+    cache the reads which were hits and `replay_workload_type` to consume IOs
+    at the recorded times.
+    """
+
+    def __init__(self, path, chunk_size=64 * 1024):
+        self.path = path
+        self.chunk_size = chunk_size
+
+        stat = os.stat(path)
+        if stat.st_size % TRACE_DTYPE.itemsize != 0:
+            raise ValueError(f'{path!r} is not a block trace: its size is not '
+                             f'a multiple of {TRACE_DTYPE.itemsize} bytes')
+        self.length = stat.st_size // TRACE_DTYPE.itemsize
+
+        # Identifies the contents of the file, for the result cache
+        self.modified = stat.st_mtime_ns
+
+    def __len__(self):
+        return self.length
+
+    @staticmethod
+    def write(path, blocks, timestamps, cached=False):
+        """Write a trace of the given columns to ``path``."""
+        blocks = np.asarray(blocks)
+        rows = np.empty(len(blocks), dtype=TRACE_DTYPE)
+        rows['block'] = blocks
+        rows['timestamp'] = timestamps
+        rows['cached'] = cached
+        rows.tofile(path)
+
+    def chunks(self, column, stop=None):
+        """
+        Yield arrays of the values of ``column`` in the first ``stop`` rows,
+        or in every row, ``chunk_size`` at a time.
+        """
+        stop = self.length if stop is None else min(stop, self.length)
+        if stop == 0:
+            return
+        # A view of the column, which is only read as it is sliced
+        values = np.memmap(self.path, dtype=TRACE_DTYPE, mode='r')[column]
+        for start in range(0, stop, self.chunk_size):
+            yield np.array(values[start:min(start + self.chunk_size, stop)])
+
+    def column(self, column, stop=None):
+        """Yield the values of ``column`` in the first ``stop`` rows."""
+        for chunk in self.chunks(column, stop):
+            yield from chunk.tolist()
+
+    def blocks(self, volume):
+        """The block numbers of the first ``volume`` reads."""
+        if volume > self.length:
+            raise ValueError(f'Cannot replay {volume} IOs from {self.path!r}, '
+                             f'which only has {self.length}')
+        return self.column('block', volume)
+
+    def gaps(self):
+        """
+        Yield the microseconds between each read and the one before it, which
+        is 0 for the first read. Timestamps going backwards give 0.
+        """
+        previous = None
+        for chunk in self.chunks('timestamp'):
+            gaps = np.diff(chunk, prepend=chunk[0] if previous is None else previous)
+            previous = chunk[-1]
+            yield from np.maximum(gaps, 0).tolist()
+
+
+class RecordedCache(CacheModel):
+    """
+    Caches the reads which were hits in ``trace``, a `BlockTrace`. The IOs of
+    a simulation are matched to the reads of the trace in order, whatever
+    blocks they read.
+    """
+
+    def __init__(self, trace):
+        self.trace = trace
+        self.recorded = None
+
+    def lookup(self, block):
+        if self.recorded is None:
+            self.recorded = self.trace.column('cached')
+        hit = next(self.recorded, None)
+        if hit is None:
+            raise ValueError(f'More IOs were read than {self.trace.path!r} '
+                             f'has reads')
+        return hit
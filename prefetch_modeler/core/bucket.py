@@ -1,8 +1,10 @@
 import collections.abc
 from collections import OrderedDict
+import itertools
 import pandas as pd
 import math
 import warnings
+from prefetch_modeler.core.numeric import Numeric
 
 
 LOG_BUCKETS = False
@@ -12,64 +14,128 @@ DEBUG = False
 class Pipeline:
     template = []
 
-    def __init__(self, *args):
+    def __init__(self, *args, numeric=None, fast_forward=False):
         self.buckets = [bucket_type(name, self) for name, bucket_type in self.template]
         self.buckets.extend(args)
 
+        # Index buckets by name, keeping the first bucket of any repeated name
+        self.by_name = {}
         for bucket in self.buckets:
-            bucket.pipeline = self
+            self.by_name.setdefault(bucket.name, bucket)
+
+        for bucket in self.buckets:
+            bucket.attach(self)
 
         self.metrics = set()
 
+        # Values computed by metrics on the current step. See memoize().
+        self.step_cache = {}
+
+        # Running aggregates kept for the whole run. See aggregate().
+        self.aggregates = {}
+
         for i in range(len(self.buckets) - 1):
             self.buckets[i].target = self.buckets[i + 1]
 
         self.tick = 0
 
+        # The tick at which each bucket asked to take action next
+        self.actionable = {}
+
+        self.numeric = numeric or Numeric()
+
+        # Whether buckets may skip ticks on which nothing would move but time,
+        # when they can work out their state at a later tick directly. Buckets
+        # which sample the time on every tick will see fewer ticks.
+        self.fast_forward = fast_forward
+
+        # The number of bucket runs performed and skipped during run()
+        self.runs = 0
+        self.skipped_runs = 0
+
     def __getitem__(self, bucket_name):
-        for bucket in self.buckets:
-            if bucket.name == bucket_name:
-                return bucket
-        raise KeyError(repr(bucket_name))
+        try:
+            return self.by_name[bucket_name]
+        except KeyError:
+            raise KeyError(repr(bucket_name)) from None
 
     def attach_metric(self, metric):
         self.metrics.add(metric)
 
-    def run(self, ios, duration=None):
-        for io in ios:
-            self.buckets[0].add(io)
+    def memoize(self, key, function):
+        """
+        Return the value of calling ``function`` the first time ``key`` is
+        looked up while the metrics of the current step are run.
+        """
+        try:
+            return self.step_cache[key]
+        except KeyError:
+            value = self.step_cache[key] = function()
+            return value
+
+    def aggregate(self, key, factory):
+        """
+        Return the aggregate stored under ``key``, which is made by calling
+        ``factory`` the first time it is asked for.
+        """
+        try:
+            return self.aggregates[key]
+        except KeyError:
+            aggregate = self.aggregates[key] = factory()
+            return aggregate
+
+    def run(self, ios, duration=None, volume=None):
+        """
+        Run the simulation of ``volume`` IOs taken from ``ios`` until all of
+        them have reached the last bucket, or until ``duration``. ``ios`` may
+        be a generator, in which case ``volume`` must be given. IOs are only
+        taken from it as the first bucket reaches them. See `Bucket.admit`.
+        """
+        if volume is None:
+            volume = len(ios)
+        self.buckets[0].admit(ios, volume)
 
         timeline = []
 
         last_tick = 0
         while self.tick != math.inf:
-            # Not possible to run some buckets and not others because one
-            # bucket may move IOs into another bucket which affect whether or
-            # not that bucket needs to run -- especially with infinity
+            # Buckets must still be visited in order because one bucket may
+            # move IOs into another bucket which affect whether or not that
+            # bucket needs to run. Isolated buckets which have not had IOs added
+            # or removed since they last ran and have not asked to run on this
+            # tick would not move anything, so their run is skipped.
             for bucket in self.buckets:
+                if bucket.isolated and not bucket.dirty and \
+                        self.actionable.get(bucket.name, self.tick) > self.tick:
+                    bucket.skip()
+                    self.skipped_runs += 1
+                    continue
                 bucket.run()
+                bucket.dirty = False
+                self.runs += 1
 
             for bucket in self.buckets:
                 bucket.reaction()
 
+            self.step_cache.clear()
             for metric in self.metrics:
                 metric.run(self)
 
             timeline.append(self.tick)
 
-            if len(self.buckets[-1]) == len(ios):
+            if len(self.buckets[-1]) == volume:
                 print("break because last bucket has all IOs")
                 break
 
-            actionable = {
+            self.actionable = {
                 bucket.name: bucket.next_action() for bucket in self.buckets
             }
             bucket_name, self.tick = min(
-                actionable.items(),
+                self.actionable.items(),
                 key=lambda item: item[1])
 
             if DEBUG and self.tick - last_tick == 1:
-                print(last_tick, actionable)
+                print(last_tick, self.actionable)
 
             if self.tick <= last_tick:
                 raise ValueError(f'Next action tick request {self.tick} (from {bucket_name}) is older than last action tick {last_tick}.')
@@ -80,7 +146,106 @@ class Pipeline:
                 break
 
 
+class Peer:
+    """
+    A reference to another bucket in the same pipeline, by name.
+
+    Declare it as a class attribute of a bucket type. When the bucket is
+    attached to a pipeline, the attribute is replaced on the instance with the
+    named bucket, so using it does not look the bucket up by name.
+    """
+
+    def __init__(self, name):
+        self.name = name
+
+    def __get__(self, bucket, owner=None):
+        if bucket is None:
+            return self
+        # The named bucket was not in the pipeline when this bucket was
+        # attached
+        return bucket.pipeline[self.name]
+
+
+class LazySource(OrderedDict):
+    """
+    The IOs in a bucket, the last ``count`` of which are taken from the
+    iterable ``ios`` only when they are first reached, by iterating over or
+    popping from the bucket. ``admitted`` is called with each IO once it has
+    been taken.
+
+    IOs not yet taken count towards the length, but are not found by lookups,
+    since nothing can refer to them yet.
+    """
+
+    def __init__(self, ios, count, admitted):
+        super().__init__()
+        self.pending_ios = iter(ios)
+        self.pending = count
+        self.admitted = admitted
+
+    def _take(self):
+        try:
+            io = next(self.pending_ios)
+        except StopIteration:
+            raise ValueError(f'IO source ran out with {self.pending} IOs '
+                             f'still to come') from None
+        self.pending -= 1
+        super().__setitem__(io, '')
+        self.admitted(io)
+        return io
+
+    def _take_all(self):
+        while self.pending:
+            self._take()
+
+    def __len__(self):
+        return super().__len__() + self.pending
+
+    def __iter__(self):
+        yield from super().__iter__()
+        while self.pending:
+            yield self._take()
+
+    def __setitem__(self, io, value):
+        # IOs added later belong after those still to be taken
+        if self.pending and io not in self:
+            self._take_all()
+        super().__setitem__(io, value)
+
+    def popitem(self, last=True):
+        if last:
+            self._take_all()
+        elif self.pending and not super().__len__():
+            self._take()
+        return super().popitem(last=last)
+
+    def clear(self):
+        self.pending = 0
+        super().clear()
+
+    def keys(self):
+        self._take_all()
+        return super().keys()
+
+    def values(self):
+        self._take_all()
+        return super().values()
+
+    def items(self):
+        self._take_all()
+        return super().items()
+
+
 class Bucket(OrderedDict):
+    # Whether run() and next_action() depend only on the IOs in this bucket
+    # and state which changes when they are moved. Subclasses overriding
+    # either in terms of other buckets must set this back to False.
+    isolated = False
+
+    # Whether to_move() always returns the first IOs in this bucket, in order.
+    # These are then moved together by move_n().
+    fifo = False
+
     def __init__(self, name):
         self.name = name
         self.pipeline = None
@@ -90,9 +255,15 @@ class Bucket(OrderedDict):
 
         self.counter = 0
 
+        # Whether IOs have been added or removed since this bucket last ran
+        self.dirty = True
+
         self._info_tick = 0
         self._info = {}
 
+        # BucketAggregates over the IOs in this bucket
+        self.aggregates = []
+
         super().__init__()
 
     @classmethod
@@ -115,13 +286,58 @@ class Bucket(OrderedDict):
         self.counter += 1
         io.on_add(self)
         self.source[io] = ''
+        self.dirty = True
+        for aggregate in self.aggregates:
+            aggregate.add(io)
+
+    def admit(self, ios, count):
+        """
+        Add ``count`` IOs taken from the iterable ``ios``. They count towards
+        the length and counter of this bucket at once, but each IO is only
+        taken from ``ios`` when this bucket first reaches it, so that IOs
+        which are still waiting here take no memory.
+
+        IOs are added one at a time with add() if it has been overridden,
+        since the override may need to see each IO as it arrives.
+        """
+        if type(self).add is not Bucket.add or self.source:
+            for io in itertools.islice(ios, count):
+                self.add(io)
+            return
+
+        tick = self.tick
+
+        def admitted(io):
+            io.on_admit(self, tick)
+            for aggregate in self.aggregates:
+                aggregate.add(io)
+
+        self.counter += count
+        self.source = LazySource(ios, count, admitted)
+        self.dirty = True
 
     def remove(self, io):
         self.source.pop(io, None)
+        self.dirty = True
+        for aggregate in self.aggregates:
+            aggregate.remove(io)
 
     def popitem(self):
         return self.source.popitem(last=False)[0]
 
+    def attach(self, pipeline):
+        """Make this bucket part of the ``pipeline`` and resolve its peers."""
+        self.pipeline = pipeline
+        seen = set()
+        for bucket_type in type(self).__mro__:
+            for attr_name, attr_value in vars(bucket_type).items():
+                if attr_name in seen:
+                    continue
+                seen.add(attr_name)
+                if isinstance(attr_value, Peer) and \
+                        attr_value.name in pipeline.by_name:
+                    setattr(self, attr_name, pipeline[attr_value.name])
+
     @property
     def tick(self):
         return self.pipeline.tick
@@ -141,17 +357,58 @@ class Bucket(OrderedDict):
 
     def run(self):
         to_move = self.to_move()
-        self.info['actual_to_move'] = frozenset(to_move)
+        self.info['actual_to_move'] = to_move if self.fifo else frozenset(to_move)
         self.info['to_move'] = len(to_move)
 
         if len(to_move):
             if LOG_BUCKETS:
                 print(f'{self.tick}: moving {len(to_move)} IOs from {self} to {self.target}')
 
+        if self.fifo:
+            self.move_n(len(to_move))
+            return
+
         for io in to_move:
             self.remove(io)
             self.target.add(io)
 
+    def move_n(self, n):
+        """Move the first ``n`` IOs to the target and return them, in order."""
+        source, target = self.source, self.target
+
+        # IOs must go through remove() and add() one at a time if either has
+        # been overridden, since the override may observe either bucket, or
+        # if either bucket has aggregates to update
+        if type(self).remove is not Bucket.remove or \
+                type(target).add is not Bucket.add or \
+                self.aggregates or target.aggregates:
+            ios = tuple(itertools.islice(source, n))
+            for io in ios:
+                self.remove(io)
+                target.add(io)
+            return ios
+
+        if n >= len(source):
+            ios = tuple(source)
+            source.clear()
+        else:
+            ios = tuple(source.popitem(last=False)[0] for _ in range(n))
+        if not ios:
+            return ios
+
+        target.counter += len(ios)
+        for io in ios:
+            io.on_add(target)
+        target.source.update(dict.fromkeys(ios, ''))
+
+        self.dirty = target.dirty = True
+        return ios
+
+    def skip(self):
+        """Called instead of run() when the bucket has nothing to move."""
+        self.info['actual_to_move'] = frozenset()
+        self.info['to_move'] = 0
+
     @property
     def ios(self):
         return self.source.keys()
@@ -1,12 +1,18 @@
+from fractions import Fraction
+import heapq
 import itertools
 import math
-from prefetch_modeler.core.bucket import Bucket
+from prefetch_modeler.core.bucket import Bucket, Peer
+from prefetch_modeler.core.deadline import DeadlineQueue
+from prefetch_modeler.core.numeric import Numeric
 from prefetch_modeler.core.units import Interval
 
 
 class GateBucket(Bucket):
     """A bucket that will move a specified number of IOs."""
 
+    fifo = True
+
     def wanted_move_size(self):
         """The number of IOs to move on this tick."""
         raise NotImplementedError()
@@ -15,24 +21,39 @@ class GateBucket(Bucket):
         size = self.wanted_move_size()
         self.info['want_to_move'] = size
         if size == math.inf:
-            return frozenset(self.source)
-        return frozenset(itertools.islice(self.source, size))
+            return tuple(self.source)
+        return tuple(itertools.islice(self.source, size))
 
 
 class DeadlineBucket(Bucket):
     """A bucket that will retain each IO through a certain deadline."""
 
+    isolated = True
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.deadlines = DeadlineQueue()
+
+    def add(self, io):
+        super().add(io)
+        # Remember which addition of the IO its deadline entry belongs to
+        self.source[io] = self.counter
+        self.deadlines.push(io.move_at, self.counter, io)
+
     def remove(self, io):
         del io.move_at
         super().remove(io)
 
+    def _is_current(self, entry):
+        _, key, io = entry
+        return self.source.get(io) == key
+
     def next_action(self):
-        if not self.source:
-            return math.inf
-        return min(io.move_at for io in self.source if io.move_at)
+        move_at = self.deadlines.first(self._is_current)
+        return math.inf if move_at is None else move_at
 
     def to_move(self):
-        return frozenset(io for io in self.source if io.move_at <= self.tick)
+        return frozenset(self.deadlines.pop_through(self.tick, self._is_current))
 
 
 class DialBucket(DeadlineBucket):
@@ -51,8 +72,11 @@ class DialBucket(DeadlineBucket):
 class ContinueBucket(Bucket):
     """A bucket that will move all its available IOs on each tick."""
 
+    isolated = True
+    fifo = True
+
     def to_move(self):
-        return frozenset(self.source)
+        return tuple(self.source)
 
     def next_action(self):
         return self.tick + 1 if self.source else math.inf
@@ -68,26 +92,59 @@ class SequenceMarkerBucket(ContinueBucket):
 
 
 class OrderEnforcerBucket(Bucket):
+    """
+    A bucket which releases IOs in the order of their sequence_id.
+
+    IOs waiting for an earlier IO are held in a heap keyed on sequence_id.
+    """
     name = 'enforcer'
+    isolated = True
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
         self.next_sequence_id = 0
         self.previous_length = 0
+        self.held = []
 
-    def to_move(self):
-        if not self.source:
-            return frozenset()
+        # The number of IOs held after each run, for reorder depth statistics
+        self.depth = 0
+        self.max_depth = 0
+        self._depth_tick = 0
+        self._depth_ticks = 0
 
-        ordered_ios = sorted(self.ios, key=lambda item: item.sequence_id)
-        result = []
+    def add(self, io):
+        super().add(io)
+        # Remember which addition of the IO its heap entry belongs to
+        self.source[io] = self.counter
+        heapq.heappush(self.held, (io.sequence_id, self.counter, io))
+
+    @property
+    def mean_depth(self):
+        """The number of IOs held, averaged over time."""
+        if self.tick == 0:
+            return self.depth
+        elapsed = self._depth_ticks + self.depth * (self.tick - self._depth_tick)
+        return elapsed / self.tick
 
-        for io in ordered_ios:
-            if io.sequence_id > self.next_sequence_id:
-                break
+    def to_move(self):
+        result = []
+        while self.held and self.held[0][0] <= self.next_sequence_id:
+            _, key, io = heapq.heappop(self.held)
+            # The IO has since left the bucket
+            if self.source.get(io) != key:
+                continue
             result.append(io)
             self.next_sequence_id += 1
 
+        self._depth_ticks += self.depth * (self.tick - self._depth_tick)
+        self._depth_tick = self.tick
+        self.depth = len(self.source) - len(result)
+        self.max_depth = max(self.max_depth, self.depth)
+
+        self.info['reorder_depth'] = self.depth
+        self.info['max_reorder_depth'] = self.max_depth
+        self.info['mean_reorder_depth'] = self.mean_depth
+
         return result
 
     def next_action(self):
@@ -101,6 +158,8 @@ class OrderEnforcerBucket(Bucket):
 class ForkBucket(Bucket):
     """A bucket which moves some IOs to a different bucket."""
 
+    isolated = True
+
     def target_bucket(self, io):
         raise NotImplementedError()
 
@@ -121,30 +180,63 @@ class ForkBucket(Bucket):
 class StopBucket(Bucket):
     """An immobile bucket."""
 
+    isolated = True
+
     def to_move(self):
         return frozenset()
 
 
+def volume_limit(numeric, rate):
+    """The volume a rate bucket may accumulate at ``rate``: enough for the
+    smallest whole number of ticks in which it can move a whole number of
+    IOs."""
+    if rate == 0:
+        return 0
+    whole_rate = numeric.ceil_div(rate, numeric.scale)
+    return numeric.ceil_div(whole_rate * numeric.scale, rate) * rate
+
+
 class RateBucket(Bucket):
+    """
+    A bucket which moves IOs at the rate it specifies.
+
+    Its volume and rate are represented according to the pipeline's `Numeric`,
+    so the volume of one IO is ``self.pipeline.numeric.scale``.
+    """
+
+    fifo = True
+
     def __init__(self, *args, **kwargs):
         self._rate = None
         self.volume = None
         self.last_tick = 0
+
+        # Only used when the pipeline's Numeric is validating
+        self._exact_rate = None
+        self._exact_volume = None
+
         super().__init__(*args, **kwargs)
 
     def rate(self):
         """The rate that the bucket should operate on."""
         raise NotImplementedError()
 
+    def steady_until(self):
+        """
+        The last tick through which rate() is known to keep returning its
+        current value. Until then, the volume at any tick follows from the
+        volume now, so the bucket need not run to accumulate it.
+        """
+        return self.tick
+
     @property
     def maximum_volume(self):
-        if self._rate == 0:
-            return 0
-        return math.ceil(math.ceil(self._rate) / self._rate) * self._rate
+        return volume_limit(self.pipeline.numeric, self._rate)
 
     def to_move(self):
+        numeric = self.pipeline.numeric
         if self._rate is None:
-            self._rate = self.rate()
+            self._rate = numeric.rate(self.rate())
 
         if self.volume is None:
             self.volume = self.maximum_volume
@@ -155,36 +247,70 @@ class RateBucket(Bucket):
             self.volume += (self.tick - self.last_tick) * self._rate
             self.volume = min(self.volume, self.maximum_volume)
 
-        moveable = max(math.floor(self.volume), 0)
+        moveable = max(numeric.whole(self.volume), 0)
 
         self.info['want_to_move'] = moveable
 
-        result = frozenset(itertools.islice(self.source, moveable))
-        self.volume -= len(result)
+        result = tuple(itertools.islice(self.source, moveable))
+        self.volume -= len(result) * numeric.scale
+
+        if numeric.validating:
+            self._track_exact_volume(len(result))
 
-        self.last_tick, self._rate = self.tick, self.rate()
+        self.last_tick, self._rate = self.tick, numeric.rate(self.rate())
 
         return result
 
+    def _track_exact_volume(self, moved):
+        """Repeat the volume calculation of to_move() with Fractions."""
+        exact = Numeric()
+        if self._exact_rate is None:
+            self._exact_rate = Fraction(self.rate())
+
+        if self._exact_volume is None:
+            self._exact_volume = volume_limit(exact, self._exact_rate)
+
+        if self.rate() == 0:
+            self._exact_volume = 0
+        else:
+            self._exact_volume += (self.tick - self.last_tick) * self._exact_rate
+            self._exact_volume = min(self._exact_volume,
+                                     volume_limit(exact, self._exact_rate))
+
+        self._exact_volume -= moved
+        self._exact_rate = Fraction(self.rate())
+
+        self.pipeline.numeric.observe(self, self.volume, self._exact_volume)
+
     def next_action(self):
         if self._rate == 0:
             return math.inf
 
+        numeric = self.pipeline.numeric
         if not self.source:
             if self.volume >= self.maximum_volume:
                 return math.inf
-            interval = (self.maximum_volume - self.volume) / self._rate
-            return self.tick + math.ceil(interval)
+            interval = numeric.ceil_div(self.maximum_volume - self.volume,
+                                        self._rate)
+            # There is nothing to move once the volume is full. If the rate
+            # holds until then, running later gives the same volume.
+            if self.pipeline.fast_forward and \
+                    self.tick + interval <= self.steady_until():
+                return math.inf
+            return self.tick + interval
 
-        if self.volume >= 1:
+        if self.volume >= numeric.scale:
             return self.tick + 1
 
         # The next tick that an IO will be moveable
-        interval = (1 - self.volume) / self._rate
-        return self.tick + math.ceil(interval)
+        interval = numeric.ceil_div(numeric.scale - self.volume, self._rate)
+        return self.tick + interval
 
 
 class SamplingRateBucket(RateBucket):
+    completed_bucket = Peer('completed')
+    consumed_bucket = Peer('consumed')
+
     def __init__(self, *args, **kwargs):
         self.ledger = [Interval(tick=0, rate=0)]
         self.sample_io = None
@@ -203,9 +329,9 @@ class SamplingRateBucket(RateBucket):
     def should_adjust(self):
         if self.sample_io is None:
             return False
-        if self.sample_io in self.pipeline['completed']:
+        if self.sample_io in self.completed_bucket:
             return True
-        if self.sample_io in self.pipeline['consumed']:
+        if self.sample_io in self.consumed_bucket:
             return True
         return False
 
@@ -233,10 +359,13 @@ class ThresholdBucket(Bucket):
     """
     A bucket which moves all IOs once a threshold is met.
     """
+
+    isolated = True
+
     def threshold(self):
         raise NotImplementedError()
 
-    def _move(self):
+    def to_move(self):
         if len(self) < self.threshold():
             return frozenset()
         return frozenset(self.source)
@@ -305,6 +434,8 @@ class GlobalCapacityBucket(CapacityBucket):
     """
     A bucket which moves all its IOs to a max of system slack
     """
+    consumed_bucket = Peer('consumed')
+
     def max_buffers(self):
         raise NotImplementedError()
 
@@ -312,7 +443,7 @@ class GlobalCapacityBucket(CapacityBucket):
         # This is in_progress from the perspective of this bucket
         # That is, all the IOs that it has seen so far minus the number of IOs
         # the client has consumed
-        in_progress = self.target.counter - len(self.pipeline['consumed'])
-        # print(f"in_progress is self.target: {self.target}'s counter: {self.target.counter} - consumed: {len(self.pipeline['consumed'])}")
+        in_progress = self.target.counter - len(self.consumed_bucket)
+        # print(f"in_progress is self.target: {self.target}'s counter: {self.target.counter} - consumed: {len(self.consumed_bucket)}")
         # In_progress shouldn't exceed max_buffers
         return max(self.max_buffers() - in_progress, 0)
@@ -0,0 +1,137 @@
+from collections import OrderedDict
+
+
+class CacheModel:
+    """
+    Decides which IOs of a simulation are cached, by the block each reads.
+    The default caches nothing.
+
+    Each run of a `Simulation` works on its own copy of the model it is given,
+    so a model may keep state between lookups.
+    """
+
+    def lookup(self, block):
+        """
+        Whether ``block`` is cached when it is read, updating the model for
+        the read.
+        """
+        return False
+
+
+class EveryOther(CacheModel):
+    """Every even numbered block is cached."""
+
+    def lookup(self, block):
+        return block % 2 == 0
+
+
+class BufferPool(CacheModel):
+    """
+    A pool of ``size`` buffers, each holding one block, which are found by
+    block number. A block is cached if it is in the pool when it is read.
+    Otherwise it is read into the pool, replacing the block in the buffer
+    chosen by `victim`.
+
+    Subclasses implement the replacement policy with `hit`, `victim` and
+    `load`. The block in each buffer is kept in ``blocks``.
+
+    ``hits`` and ``misses`` count the lookups of each kind.
+    """
+
+    def __init__(self, size):
+        if size < 1:
+            raise ValueError(f'A buffer pool needs at least one buffer, not {size}')
+        self.size = size
+        self.hits = 0
+        self.misses = 0
+
+        # Buffer number of each block in the pool, and the block in each
+        # buffer
+        self.index = {}
+        self.blocks = [None] * size
+
+    def lookup(self, block):
+        buffer = self.index.get(block)
+        if buffer is not None:
+            self.hits += 1
+            self.hit(buffer)
+            return True
+
+        self.misses += 1
+        if len(self.index) < self.size:
+            buffer = len(self.index)
+        else:
+            buffer = self.victim()
+            del self.index[self.blocks[buffer]]
+        self.index[block] = buffer
+        self.blocks[buffer] = block
+        self.load(buffer, block)
+        return False
+
+    @property
+    def hit_ratio(self):
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else None
+
+    def hit(self, buffer):
+        """Called when the block in ``buffer`` is read."""
+        raise NotImplementedError()
+
+    def victim(self):
+        """Return the buffer whose block to replace. Only called once the
+        pool is full."""
+        raise NotImplementedError()
+
+    def load(self, buffer, block):
+        """Called when ``block`` is read into ``buffer``."""
+        raise NotImplementedError()
+
+
+class ClockSweep(BufferPool):
+    """
+    Replaces blocks as PostgreSQL's shared buffers do. Each buffer has a
+    usage count, which is raised by each read of its block up to
+    ``max_usage``. To find a victim, a clock hand sweeps over the buffers,
+    lowering the usage count of each it passes, and stops at the first
+    buffer whose count is zero.
+    """
+
+    def __init__(self, size, max_usage=5):
+        super().__init__(size)
+        self.max_usage = max_usage
+        self.usage = [0] * size
+        self.hand = 0
+
+    def hit(self, buffer):
+        if self.usage[buffer] < self.max_usage:
+            self.usage[buffer] += 1
+
+    def victim(self):
+        usage, size = self.usage, self.size
+        hand = self.hand
+        while usage[hand] > 0:
+            usage[hand] -= 1
+            hand = (hand + 1) % size
+        self.hand = (hand + 1) % size
+        return hand
+
+    def load(self, buffer, block):
+        self.usage[buffer] = 1
+
+
+class LRU(BufferPool):
+    """Replaces the block which was read least recently."""
+
+    def __init__(self, size):
+        super().__init__(size)
+        self.recency = OrderedDict()
+
+    def hit(self, buffer):
+        self.recency.move_to_end(buffer)
+
+    def victim(self):
+        return next(iter(self.recency))
+
+    def load(self, buffer, block):
+        self.recency[buffer] = None
+        self.recency.move_to_end(buffer)
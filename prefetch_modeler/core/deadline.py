@@ -0,0 +1,65 @@
+from collections import deque
+import heapq
+
+
+class DeadlineQueue:
+    """
+    Entries of (deadline, key, io) ordered by deadline, then by key.
+
+    While deadlines are pushed in nondecreasing order -- as they are when every
+    IO is retained for the same amount of time -- the entries are kept in a
+    FIFO. Once a deadline arrives out of order, they are moved into a heap until
+    it drains.
+
+    Entries are not removed when their IO leaves the owning bucket. Instead,
+    callers pass ``is_current``, which is called with an entry and returns
+    whether it still describes an IO in the bucket.
+    """
+
+    def __init__(self):
+        self.fifo = deque()
+        self.heap = None
+
+    def __len__(self):
+        return len(self.heap) if self.heap is not None else len(self.fifo)
+
+    def push(self, deadline, key, io):
+        entry = (deadline, key, io)
+        if self.heap is not None:
+            heapq.heappush(self.heap, entry)
+        elif not self.fifo or self.fifo[-1][:2] <= entry[:2]:
+            self.fifo.append(entry)
+        else:
+            # A sorted list is already a valid heap
+            self.heap = list(self.fifo)
+            self.fifo.clear()
+            heapq.heappush(self.heap, entry)
+
+    def _first(self):
+        return self.heap[0] if self.heap is not None else self.fifo[0]
+
+    def _pop(self):
+        if self.heap is None:
+            return self.fifo.popleft()
+        entry = heapq.heappop(self.heap)
+        if not self.heap:
+            self.heap = None
+        return entry
+
+    def first(self, is_current):
+        """Return the earliest current deadline or None if there is none."""
+        while len(self):
+            entry = self._first()
+            if is_current(entry):
+                return entry[0]
+            self._pop()
+        return None
+
+    def pop_through(self, deadline, is_current):
+        """Remove and return the IOs of current entries due by ``deadline``."""
+        result = []
+        while len(self) and self._first()[0] <= deadline:
+            entry = self._pop()
+            if is_current(entry):
+                result.append(entry[2])
+        return result
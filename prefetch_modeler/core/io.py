@@ -1,31 +1,52 @@
-import pandas as pd
+from prefetch_modeler.core.trace import TraceLog
 
 
 class IO:
+    # Attributes which buckets commonly set on IOs are stored in slots rather
+    # than in a per-IO dict. As with ordinary attributes, an unset slot raises
+    # AttributeError, so hasattr() and getattr() with a default still work.
+    # Any other attribute is stored in __dict__, which is only created when
+    # one is set.
+    __slots__ = (
+        'block', 'cached', 'sequence_id', 'move_at', 'prefetch_distance', 'change_id',
+        'submitted', 'submission_time', 'completed', 'completion_time',
+        'consumption_time', 'processing_time', 'wait_time', 'contention',
+        'accounted', '__dict__',
+    )
+
     def on_add(self, bucket):
         """Called when the IO is added to the ``bucket``."""
         pass
 
+    def on_admit(self, bucket, tick):
+        """
+        Called instead of on_add when the IO, added to the ``bucket`` at
+        ``tick`` by `Bucket.admit`, is first reached.
+        """
+        self.on_add(bucket)
+
     def on_discard(self, bucket):
         """Called when the IO is discarded from the ``bucket``."""
         pass
 
 
 class Tracer(IO):
-    """An `IO` that will record the tick of each transition to a bucket."""
+    """
+    An `IO` that will record the tick of each transition to a bucket in
+    ``log``, a `TraceLog` which may be shared with other tracers.
+    """
 
-    def __init__(self, id):
+    def __init__(self, id, log=None):
         self.id = id
-        self._data = []
+        self.log = TraceLog() if log is None else log
 
     @property
     def data(self):
         """Return the data stored in this tracer as a `DataFrame`."""
-        data = pd.DataFrame(self._data)
-        data['interval'] = -data['tick'].diff(-1).astype('Int64')
-        return data
+        return self.log.transitions(self.id)
 
     def on_add(self, bucket):
-        self._data.append({
-            'io': self.id, 'bucket': bucket.name, 'tick': bucket.tick or 0,
-        })
+        self.log.record(self.id, bucket)
+
+    def on_admit(self, bucket, tick):
+        self.log.record(self.id, bucket, tick)
@@ -0,0 +1,118 @@
+from fractions import Fraction
+import math
+import warnings
+
+
+class Numeric:
+    """
+    How rates and the volumes of rate buckets are represented.
+
+    The default keeps whatever values rate() returns -- usually Fractions from
+    `Rate` -- and so is exact, but the denominators of Fractions which are
+    repeatedly added together grow without bound.
+
+    Volumes are held multiplied by ``scale``, so one IO of volume is ``scale``.
+    """
+
+    scale = 1
+
+    def rate(self, value):
+        """Convert a rate in IOs per microsecond."""
+        return value
+
+    def quotient(self, numerator, denominator):
+        """Divide two numbers to give a rate, for example in a ledger."""
+        return Fraction(numerator, denominator)
+
+    def ceil_div(self, numerator, denominator):
+        return math.ceil(numerator / denominator)
+
+    def whole(self, volume):
+        """The number of whole IOs in ``volume``."""
+        return math.floor(volume)
+
+    def observe(self, bucket, volume, exact_volume):
+        """Called by rate buckets with their volume on each run when
+        validating."""
+        pass
+
+    @property
+    def validating(self):
+        return False
+
+
+class FloatNumeric(Numeric):
+    """Rates and volumes are floats."""
+
+    def rate(self, value):
+        return float(value)
+
+    def quotient(self, numerator, denominator):
+        return numerator / denominator
+
+
+class FixedPointNumeric(Numeric):
+    """
+    Rates and volumes are integers scaled by 10^6.
+
+    A rate is then a whole number of IOs per second, so rates made with
+    ``Rate(per_second=...)`` are represented exactly.
+    """
+
+    scale = 1000 * 1000
+
+    def rate(self, value):
+        return round(value * self.scale)
+
+    def quotient(self, numerator, denominator):
+        return Fraction(round(Fraction(numerator * self.scale) / denominator),
+                        self.scale)
+
+    def ceil_div(self, numerator, denominator):
+        return -(-numerator // denominator)
+
+    def whole(self, volume):
+        return volume // self.scale
+
+
+class ValidatedNumeric(Numeric):
+    """
+    Wraps another `Numeric` and has rate buckets track what their volume would
+    be with exact Fractions. Warns the first time a bucket's volume diverges by
+    more than ``tolerance`` IOs.
+    """
+
+    def __init__(self, numeric, tolerance=1):
+        self.numeric = numeric
+        self.tolerance = tolerance
+        self.divergence = {}
+
+    @property
+    def scale(self):
+        return self.numeric.scale
+
+    @property
+    def validating(self):
+        return True
+
+    def rate(self, value):
+        return self.numeric.rate(value)
+
+    def quotient(self, numerator, denominator):
+        return self.numeric.quotient(numerator, denominator)
+
+    def ceil_div(self, numerator, denominator):
+        return self.numeric.ceil_div(numerator, denominator)
+
+    def whole(self, volume):
+        return self.numeric.whole(volume)
+
+    def observe(self, bucket, volume, exact_volume):
+        divergence = abs(Fraction(volume) / self.scale - exact_volume)
+        bucket.info['volume_divergence'] = float(divergence)
+
+        previous = self.divergence.get(bucket.name, 0)
+        if divergence > self.tolerance >= previous:
+            warnings.warn(f'{bucket!r} volume diverged from exact by '
+                          f'{float(divergence)} IOs at tick {bucket.tick}')
+        self.divergence[bucket.name] = max(previous, divergence)
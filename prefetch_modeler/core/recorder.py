@@ -0,0 +1,114 @@
+import numpy as np
+import pandas as pd
+
+
+class Column:
+    """
+    A growable, typed NumPy array. Capacity doubles when it is exhausted so
+    appending is amortized O(1).
+    """
+
+    def __init__(self, dtype, capacity=1024):
+        self.array = np.empty(capacity, dtype=dtype)
+        self.length = 0
+
+    def __len__(self):
+        return self.length
+
+    def append(self, value):
+        if self.length == len(self.array):
+            # An unpickled empty column has no capacity at all
+            self.array = np.resize(self.array, max(1, 2 * len(self.array)))
+        self.array[self.length] = value
+        self.length += 1
+
+    @property
+    def values(self):
+        """A view of the values appended so far."""
+        return self.array[:self.length]
+
+    def __getstate__(self):
+        # Leave out the unused capacity
+        return {'array': self.values.copy(), 'length': self.length}
+
+    def decimate(self):
+        """Keep only every other value, starting with the first."""
+        kept = self.array[:self.length:2]
+        self.length = len(kept)
+        self.array[:self.length] = kept
+
+
+class Recorder:
+    """
+    Records (tick, value) samples of a metric in columns.
+
+    A value of None is recorded as NaN with its entry in ``mask`` set.
+
+    Given a ``sink``, samples are also written to it in chunks of
+    ``chunk_size``. Unless ``keep`` is set, samples are dropped once written,
+    so the memory used stays bounded.
+    """
+
+    def __init__(self, name, capacity=1024, sink=None, keep=True,
+                 chunk_size=16 * 1024):
+        self.name = name
+        self.ticks = Column(np.int64, capacity)
+        self.values = Column(np.float64, capacity)
+        self.mask = Column(np.bool_, capacity)
+
+        self.sink = sink
+        self.keep = keep
+        self.chunk_size = chunk_size
+        # The number of samples held which have been written to the sink
+        self.flushed = 0
+
+    def __len__(self):
+        return len(self.ticks)
+
+    def __getstate__(self):
+        # Sinks write to open files, which cannot be pickled. An unpickled
+        # recorder has not written anything to the sink it is next given.
+        return {**vars(self), 'sink': None, 'flushed': 0}
+
+    def append(self, tick, value):
+        self.ticks.append(tick)
+        if value is None:
+            self.values.append(np.nan)
+            self.mask.append(True)
+        else:
+            self.values.append(value)
+            self.mask.append(False)
+
+        if self.sink is not None and \
+                len(self) - self.flushed >= self.chunk_size:
+            self.flush()
+
+    def flush(self):
+        """Write the samples not yet written to the sink."""
+        if self.sink is None or self.flushed == len(self):
+            return
+        self.sink.write(self.name, self.ticks.values[self.flushed:],
+                        self.values.values[self.flushed:])
+        if self.keep:
+            self.flushed = len(self)
+        else:
+            self.ticks.length = self.values.length = self.mask.length = 0
+            self.flushed = 0
+
+    def decimate(self):
+        """
+        Keep only every other sample, starting with the first. Samples
+        already written to the sink stay written.
+        """
+        self.flush()
+        self.ticks.decimate()
+        self.values.decimate()
+        self.mask.decimate()
+        self.flushed = len(self)
+
+    @property
+    def data(self):
+        """A DataFrame indexed by tick which shares the recorded arrays."""
+        index = pd.Index(self.ticks.values, name='tick', copy=False)
+        return pd.DataFrame({self.name: self.values.values}, index=index,
+                            copy=False)
@@ -0,0 +1,88 @@
+import math
+
+
+class Sampling:
+    """
+    Decides on which steps a `Metric` is evaluated and which of its values
+    are recorded. The default samples every step.
+
+    Each `Metric` works on its own copy of the policy it is given, so a policy
+    may keep state between steps.
+    """
+
+    def due(self, tick):
+        """Whether the metric should be evaluated on the step at ``tick``."""
+        return True
+
+    def record(self, recorder, tick, value):
+        recorder.append(tick, value)
+
+    def finish(self, recorder):
+        """Called once the pipeline has stopped running."""
+        pass
+
+
+class EveryN(Sampling):
+    """Sample on the first step at least ``n`` ticks after the last sample."""
+
+    def __init__(self, n):
+        self.n = n
+        self.next_tick = -math.inf
+
+    def due(self, tick):
+        return tick >= self.next_tick
+
+    def record(self, recorder, tick, value):
+        recorder.append(tick, value)
+        self.next_tick = tick + self.n
+
+
+def _same(a, b):
+    return a == b or (a != a and b != b)
+
+
+class OnChange(Sampling):
+    """
+    Evaluate on every step but only record a value when it differs from the
+    previous one, so that each sample starts a run of equal values. The last
+    value is recorded when the run finishes so the runs have an end.
+    """
+
+    def __init__(self):
+        self.last = None
+
+    def record(self, recorder, tick, value):
+        if self.last is None or not _same(value, self.last[1]):
+            recorder.append(tick, value)
+            self.last = (tick, value, True)
+        else:
+            self.last = (tick, value, False)
+
+    def finish(self, recorder):
+        if self.last is not None and not self.last[2]:
+            recorder.append(*self.last[:2])
+
+
+class Decimate(Sampling):
+    """
+    Keep between ``points`` and 2 * ``points`` samples taken at evenly spaced
+    steps, however many steps are run. Whenever 2 * ``points`` samples have
+    been recorded, every other one is dropped and the metric is evaluated
+    half as often from then on.
+    """
+
+    def __init__(self, points):
+        self.points = points
+        self.stride = 1
+        self.steps = 0
+
+    def due(self, tick):
+        due = self.steps % self.stride == 0
+        self.steps += 1
+        return due
+
+    def record(self, recorder, tick, value):
+        recorder.append(tick, value)
+        if len(recorder) >= 2 * self.points:
+            recorder.decimate()
+            self.stride *= 2
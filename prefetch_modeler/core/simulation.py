@@ -1,28 +1,71 @@
+import copy
 from dataclasses import dataclass
 import pandas as pd
 from prefetch_modeler.core import IO, Tracer, Pipeline
+from prefetch_modeler.core.recorder import Recorder
+from prefetch_modeler.core.sampling import Sampling
+from prefetch_modeler.core.trace import TraceLog
+from prefetch_modeler.core.buffer_pool import CacheModel, EveryOther
 from typing import List
 from collections import OrderedDict
 
 
 class Metric:
-    def __init__(self, name=None):
+    sampling = Sampling()
+
+    def __init__(self, name=None, sampling=None):
         self._name = name
-        self._data = []
+        self._recorder = None
+        self.sampling = copy.copy(sampling or self.sampling)
+        self.sink = None
+        self.keep = True
 
     @property
     def name(self):
         return self._name or type(self).__name__
 
     def run(self, pipeline):
-        result = self.function(pipeline)
-        self._data.append({'tick': pipeline.tick, self.name: result})
+        if not self.sampling.due(pipeline.tick):
+            return
+        if self._recorder is None:
+            self._recorder = Recorder(self.name, sink=self.sink, keep=self.keep)
+        self.sampling.record(self._recorder, pipeline.tick,
+                             self.value(pipeline))
+
+    def stream(self, sink, keep=True):
+        """
+        Write samples to ``sink`` as they are recorded. Unless ``keep`` is
+        set, they are then dropped and will not be in `data`.
+        """
+        self.sink, self.keep = sink, keep
+        if self._recorder is not None:
+            self._recorder.flush()
+            self._recorder.sink, self._recorder.keep = sink, keep
+
+    @property
+    def recorder(self):
+        return self._recorder
+
+    def restore(self, recorder):
+        """Use samples recorded elsewhere, for example in another process."""
+        self._recorder = recorder
+
+    def finish(self):
+        if self._recorder is not None:
+            self.sampling.finish(self._recorder)
+            self._recorder.flush()
 
     @property
     def data(self):
-        df = pd.DataFrame.from_records(self._data, index='tick')
-        print(df)
-        return df
+        if self._recorder is None:
+            return pd.DataFrame(columns=[self.name],
+                                index=pd.Index([], name='tick'))
+        return self._recorder.data
+
+    @classmethod
+    def value(cls, pipeline):
+        """The value of the metric on the current step, computed once."""
+        return pipeline.memoize(cls, lambda: cls.function(pipeline))
 
     @staticmethod
     def function(pipeline):
@@ -30,46 +73,96 @@ class Metric:
 
 
 class Simulation:
-    def __init__(self, *args):
-        self.schema = args
-        self.metrics = []
+    """
+    A pipeline of the bucket types in ``args``, run with `run`.
 
-    def run(self, volume, duration=None, traced=None):
-        traced = traced or OrderedDict()
-        ios = [Tracer(i) if i in traced else IO() for i in range(volume)]
+    Each IO reads a block. ``blocks`` is called with the volume of a run and
+    returns the block number of each IO, in order. By default IO n reads
+    block n. ``cache`` is a `CacheModel` deciding which IOs are cached by the
+    blocks they read, such as a `BufferPool`. By default every other block is
+    cached.
+    """
 
-        for i, io in enumerate(ios):
-            if i % 2 == 0:
-                io.cached = True
-        #     # if i > volume / 1.5:
-        #     #     io.cached = True
+    def __init__(self, *args, cache=None, blocks=None):
+        self.schema = args
+        self.metrics = []
+        self.cache = EveryOther() if cache is None else cache
+        self.blocks = blocks
+
+    def metric(self, metric_type, sampling=None):
+        """
+        Return the metric of ``metric_type`` recorded with ``sampling`` by this
+        simulation, adding one if there is none, so that charts showing the
+        same metric share its series.
+        """
+        key = (metric_type, sampling)
+        for metric in self.metrics:
+            if getattr(metric, 'key', None) == key:
+                return metric
+        metric = metric_type(sampling=sampling)
+        metric.key = key
+        self.metrics.append(metric)
+        return metric
+
+    def run(self, volume, duration=None, traced=None, numeric=None,
+            fast_forward=False, sink=None, keep_metrics=True,
+            trace_every=None, trace_if=None):
+        # IOs numbered in traced are traced, as is every trace_every'th IO
+        # for which trace_if holds
+        trace = TraceLog(traced or (), every=trace_every, predicate=trace_if,
+                         sink=sink, keep=keep_metrics)
+
+        cache = copy.deepcopy(self.cache)
+        blocks = range(volume) if self.blocks is None else self.blocks(volume)
+
+        # IOs are made as the first bucket reaches them, so only those which
+        # have been reached take memory
+        def ios():
+            for i, block in zip(range(volume), blocks):
+                io = IO()
+                io.block = block
+                if cache.lookup(block):
+                    io.cached = True
+                if trace.selects(i, io):
+                    cached = getattr(io, 'cached', None)
+                    io = Tracer(i, trace)
+                    if cached is not None:
+                        io.cached = cached
+                yield io
 
         pipeline = Pipeline(*[bucket_type(
             getattr(bucket_type, 'name', bucket_type.__name__)
-        ) for bucket_type in self.schema])
+        ) for bucket_type in self.schema], numeric=numeric,
+            fast_forward=fast_forward)
 
         for metric in self.metrics:
+            if sink is not None:
+                metric.stream(sink, keep=keep_metrics)
             pipeline.attach_metric(metric)
 
-        timeline = pipeline.run(ios, duration=duration)
+        timeline = pipeline.run(ios(), duration=duration, volume=volume)
+
+        for metric in self.metrics:
+            metric.finish()
 
         bucket_sequence = [bucket.name for bucket in pipeline.buckets]
-        tracer_list = [io for io in ios if isinstance(io, Tracer)]
-        if tracer_list:
-            tracer_data = pd.concat(tracer.data for tracer in tracer_list) \
-                .dropna(axis='index', subset='interval') \
-                .pivot(index='io', columns='bucket', values='interval') \
-                .reindex(bucket_sequence, axis='columns', fill_value=0)
-        else:
-            tracer_data = None
+        tracer_data = None
+        if not trace.keep and sink is not None:
+            # The transitions have been written to the sink as the run went
+            trace.flush(final=True)
+        elif len(trace):
+            tracer_data = trace.data(bucket_sequence)
+            if sink is not None:
+                sink.write_tracer(tracer_data)
 
         if hasattr(pipeline, 'ratelimiter'):
             inflight_scores = OrderedDict(sorted(pipeline['ratelimiter'].inflight_scores.items()))
 
-        return SimulationResult(timeline, tracer_data, pipeline)
+        return SimulationResult(timeline, tracer_data, pipeline, cache)
 
 @dataclass(frozen=True)
 class SimulationResult:
     timeline: List
     tracer_data: pd.DataFrame
     pipeline: Pipeline
+    cache: CacheModel = None
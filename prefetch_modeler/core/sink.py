@@ -0,0 +1,142 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+
+class MetricSink:
+    """
+    Receives metric samples in chunks while a simulation runs, and the tracer
+    data of each run once it finishes, and writes them to files.
+
+    Metric samples are written in long format, with columns run, metric, tick
+    and value. Tracer data is written to a separate file with columns run, io,
+    bucket and interval. Call `begin` with the name of each run before it
+    starts.
+    """
+
+    def __init__(self, path, tracer_path=None):
+        self.path = path
+        if tracer_path is None:
+            root, ext = os.path.splitext(path)
+            tracer_path = f'{root}.tracer{ext}'
+        self.tracer_path = tracer_path
+        self.run = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def begin(self, run):
+        self.run = run
+
+    def write(self, metric, ticks, values):
+        self.write_metrics(pd.DataFrame({
+            'run': pd.Series([str(self.run)] * len(ticks), dtype=object),
+            'metric': pd.Series([metric] * len(ticks), dtype=object),
+            'tick': np.asarray(ticks, dtype=np.int64),
+            'value': np.asarray(values, dtype=np.float64),
+        }))
+
+    def write_tracer(self, data):
+        """Write the tracer data of a run, as made by `Simulation.run`."""
+        data = data.rename_axis(index='io', columns='bucket').stack()
+        data = data.rename('interval').reset_index()
+        data.insert(0, 'run', str(self.run))
+        data['io'] = data['io'].astype(np.int64)
+        data['bucket'] = data['bucket'].astype(object)
+        data['interval'] = data['interval'].to_numpy(dtype=np.float64,
+                                                     na_value=np.nan)
+        self.write_tracer_rows(data)
+
+    def write_tracer_intervals(self, ios, buckets, intervals):
+        """Write the intervals spent in buckets by traced IOs."""
+        self.write_tracer_rows(pd.DataFrame({
+            'run': pd.Series([str(self.run)] * len(ios), dtype=object),
+            'io': np.asarray(ios, dtype=np.int64),
+            'bucket': pd.Series(buckets, dtype=object),
+            'interval': np.asarray(intervals, dtype=np.float64),
+        }))
+
+    def write_metrics(self, frame):
+        raise NotImplementedError()
+
+    def write_tracer_rows(self, frame):
+        raise NotImplementedError()
+
+    def close(self):
+        pass
+
+
+class CSVSink(MetricSink):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.files = {}
+
+    def _append(self, path, frame):
+        file = self.files.get(path)
+        header = file is None
+        if header:
+            file = self.files[path] = open(path, 'w', newline='')
+        frame.to_csv(file, header=header, index=False)
+
+    def write_metrics(self, frame):
+        self._append(self.path, frame)
+
+    def write_tracer_rows(self, frame):
+        self._append(self.tracer_path, frame)
+
+    def close(self):
+        for file in self.files.values():
+            file.close()
+        self.files.clear()
+
+
+class ParquetSink(MetricSink):
+    """Writes each chunk as a row group. Requires pyarrow."""
+
+    def __init__(self, *args, **kwargs):
+        try:
+            import pyarrow
+            import pyarrow.parquet
+        except ImportError:
+            raise ImportError('Writing Parquet files requires pyarrow') from None
+        self.pyarrow = pyarrow
+        super().__init__(*args, **kwargs)
+        self.writers = {}
+
+    def _append(self, path, frame):
+        table = self.pyarrow.Table.from_pandas(frame, preserve_index=False)
+        writer = self.writers.get(path)
+        if writer is None:
+            writer = self.writers[path] = self.pyarrow.parquet.ParquetWriter(
+                path, table.schema)
+        writer.write_table(table)
+
+    def write_metrics(self, frame):
+        self._append(self.path, frame)
+
+    def write_tracer_rows(self, frame):
+        self._append(self.tracer_path, frame)
+
+    def close(self):
+        for writer in self.writers.values():
+            writer.close()
+        self.writers.clear()
+
+
+SINKS = {'.csv': CSVSink, '.parquet': ParquetSink}
+
+
+def open_sink(path, tracer_path=None):
+    """Return a sink which writes the format given by the extension of
+    ``path``."""
+    ext = os.path.splitext(path)[1].lower()
+    try:
+        sink_type = SINKS[ext]
+    except KeyError:
+        raise ValueError(f'Unknown export format {ext!r} of {path!r}, '
+                         f'expected one of {", ".join(SINKS)}') from None
+    return sink_type(path, tracer_path)
@@ -0,0 +1,169 @@
+import numpy as np
+import pandas as pd
+
+from prefetch_modeler.core.recorder import Column
+
+
+def uncached(io):
+    """Select IOs which are not cached, for `TraceLog`."""
+    return not getattr(io, 'cached', False)
+
+
+class TraceLog:
+    """
+    The transitions of traced IOs between buckets, recorded as (io, bucket,
+    tick) in columns shared by all of them.
+
+    IOs are selected by number, those in ``ids``, and by counting those which
+    ``predicate`` holds for, or all IOs if there is none: every ``every``th of
+    them is selected, starting with the first. A predicate alone selects every
+    IO it holds for.
+
+    Unless ``keep`` is set, transitions are written to ``sink`` in chunks
+    once their interval is known and then dropped, so memory stays bounded
+    however many IOs are traced.
+    """
+
+    def __init__(self, ids=(), every=None, predicate=None, sink=None,
+                 keep=True, chunk_size=64 * 1024):
+        self.ids = set(ids)
+        self.every = every
+        self.predicate = predicate
+        self.sink = sink
+        self.keep = keep
+        self.chunk_size = chunk_size
+
+        # The number of IOs which predicate held for so far
+        self.matched = 0
+
+        self.io_ids = Column(np.int64)
+        self.buckets = Column(np.int64)
+        self.ticks = Column(np.int64)
+        self.bucket_names = []
+        self.bucket_index = {}
+
+    def __len__(self):
+        return len(self.ticks)
+
+    def selects(self, number, io):
+        """
+        Whether the IO numbered ``number`` should be traced. Called once for
+        each IO, in order.
+        """
+        if number in self.ids:
+            return True
+        if self.every is None and self.predicate is None:
+            return False
+        if self.predicate is not None and not self.predicate(io):
+            return False
+        self.matched += 1
+        return self.every is None or (self.matched - 1) % self.every == 0
+
+    def record(self, io_id, bucket, tick=None):
+        index = self.bucket_index.get(bucket.name)
+        if index is None:
+            index = self.bucket_index[bucket.name] = len(self.bucket_names)
+            self.bucket_names.append(bucket.name)
+
+        self.io_ids.append(io_id)
+        self.buckets.append(index)
+        self.ticks.append((bucket.tick if tick is None else tick) or 0)
+
+        if not self.keep and self.sink is not None and \
+                len(self) >= self.chunk_size:
+            self.flush()
+
+    def _intervals(self, io_id=None):
+        """
+        Return the io, bucket index, tick and interval to the next transition
+        of every transition, ordered by io and then by when it happened. The
+        last transition of each IO has an interval of -1.
+        """
+        ios, buckets, ticks = \
+            self.io_ids.values, self.buckets.values, self.ticks.values
+        if io_id is not None:
+            selected = ios == io_id
+            ios, buckets, ticks = ios[selected], buckets[selected], ticks[selected]
+
+        order = np.argsort(ios, kind='stable')
+        ios, buckets, ticks = ios[order], buckets[order], ticks[order]
+
+        intervals = np.full(len(ticks), -1, dtype=np.int64)
+        has_next = ios[:-1] == ios[1:]
+        intervals[:-1][has_next] = (ticks[1:] - ticks[:-1])[has_next]
+        return ios, buckets, ticks, intervals
+
+    def flush(self, final=False):
+        """
+        Write the transitions whose interval is known to the sink and drop
+        them. The last transition of each IO is held back until its next
+        transition is recorded, unless ``final`` is set.
+        """
+        if self.sink is None:
+            return
+        ios, buckets, ticks, intervals = self._intervals()
+        complete = intervals >= 0
+        self.sink.write_tracer_intervals(
+            ios[complete], [self.bucket_names[i] for i in buckets[complete]],
+            intervals[complete])
+
+        for column in (self.io_ids, self.buckets, self.ticks):
+            column.length = 0
+        if not final:
+            for io_id, bucket, tick in zip(ios[~complete], buckets[~complete],
+                                           ticks[~complete]):
+                self.io_ids.append(io_id)
+                self.buckets.append(bucket)
+                self.ticks.append(tick)
+
+            # Don't flush on every transition while many IOs are in flight
+            if len(self) >= self.chunk_size // 2:
+                self.chunk_size *= 2
+
+    def transitions(self, io_id=None):
+        """
+        A DataFrame of each transition with columns io, bucket, tick and
+        interval, the ticks until the IO's next transition.
+        """
+        ios, buckets, ticks, intervals = self._intervals(io_id)
+        interval = pd.array(intervals, dtype='Int64')
+        interval[intervals < 0] = pd.NA
+        return pd.DataFrame({
+            'io': ios,
+            'bucket': [self.bucket_names[i] for i in buckets],
+            'tick': ticks,
+            'interval': interval,
+        })
+
+    def data(self, bucket_sequence):
+        """
+        A DataFrame of the ticks each traced IO spent in each bucket of
+        ``bucket_sequence``, indexed by io. The last bucket an IO reached is
+        not included. Buckets which no IO left are 0.
+        """
+        ios, buckets, _, intervals = self._intervals()
+        complete = intervals >= 0
+        ios, buckets, intervals = \
+            ios[complete], buckets[complete], intervals[complete]
+
+        index, rows = np.unique(ios, return_inverse=True)
+        values = np.zeros((len(index), len(self.bucket_names)), dtype=np.int64)
+        missing = np.ones(values.shape, dtype=bool)
+        values[rows, buckets] = intervals
+        missing[rows, buckets] = False
+        left = np.zeros(len(self.bucket_names), dtype=bool)
+        left[buckets] = True
+
+        columns = {}
+        for name in bucket_sequence:
+            i = self.bucket_index.get(name)
+            if i is None or not left[i]:
+                columns[name] = np.zeros(len(index), dtype=np.int64)
+            else:
+                column = pd.array(values[:, i], dtype='Int64')
+                column[missing[:, i]] = pd.NA
+                columns[name] = column
+
+        data = pd.DataFrame(columns, index=pd.Index(index, name='io'))
+        data.columns.name = 'bucket'
+        return data
@@ -1,5 +1,5 @@
 from prefetch_modeler.core import ContinueBucket, GlobalCapacityBucket, RateBucket, \
-Rate, Duration, ForkBucket
+Rate, Duration, ForkBucket, Peer
 from dataclasses import dataclass
 from fractions import Fraction
 import itertools
@@ -12,6 +12,7 @@ import math
 # adding wait_time and idle_time to baselines
 class BaselineSync(GlobalCapacityBucket):
     name = 'remaining'
+    completed_bucket = Peer('completed')
 
     def __init__(self, *args, **kwargs):
         self.waited_at = None
@@ -34,7 +35,7 @@ class BaselineSync(GlobalCapacityBucket):
         return super().remove(io)
 
     def reaction(self):
-        completed = self.pipeline['completed']
+        completed = self.completed_bucket
         for io in completed:
             io.completion_time = getattr(io, "completion_time", self.tick)
 
@@ -46,6 +47,7 @@ class BaselineSync(GlobalCapacityBucket):
 
 class BaselineFetchAll(ContinueBucket):
     name = 'remaining'
+    completed_bucket = Peer('completed')
 
     @classmethod
     def hint(cls):
@@ -56,7 +58,7 @@ class BaselineFetchAll(ContinueBucket):
         return super().remove(io)
 
     def reaction(self):
-        completed = self.pipeline['completed']
+        completed = self.completed_bucket
         for io in completed:
             io.completion_time = getattr(io, "completion_time", self.tick)
 
@@ -74,6 +76,9 @@ class ConstantRatePrefetcher(RateBucket):
     def rate(self):
         return self.og_rate.value
 
+    def steady_until(self):
+        return math.inf
+
 
 def recent_mean(iterator, take=8):
     numerator = denominator = 0
@@ -121,9 +126,11 @@ class BufferMarkerBucket(CachedMarkerBucket):
 
 
 class BufferChecker(ForkBucket):
+    completed_bucket = Peer('completed')
+
     def target_bucket(self, io):
         if getattr(io, 'cached', None):
-            return self.pipeline['completed']
+            return self.completed_bucket
         return self.target
 
 
@@ -139,6 +146,10 @@ class PIPrefetcher(RateBucket):
     ki_cnc = -Rate(per_second=40).value
     cnc_headroom = 8
 
+    completed_bucket = Peer('completed')
+    consumed_bucket = Peer('consumed')
+    inflight_bucket = Peer('inflight')
+
     def __init__(self, *args, **kwargs):
         self.ledger = [LedgerEntry(tick=0,
                                    raw_demand_rate=0,
@@ -161,19 +172,19 @@ class PIPrefetcher(RateBucket):
 
     @property
     def lifetime_demands(self):
-        return self.pipeline['consumed'].counter
+        return self.consumed_bucket.counter
 
     @property
     def lifetime_completes(self):
-        return self.pipeline['completed'].counter
+        return self.completed_bucket.counter
 
     @property
     def completed(self):
-        return len(self.pipeline['completed'])
+        return len(self.completed_bucket)
 
     @property
     def inflight(self):
-        return len(self.pipeline['inflight'])
+        return len(self.inflight_bucket)
 
     @property
     def raw_demand_rate(self):
@@ -193,7 +204,7 @@ class PIPrefetcher(RateBucket):
         if time_elapsed == 0:
             raw_rate = 0
         else:
-            raw_rate = Fraction(number_moved, time_elapsed)
+            raw_rate = self.pipeline.numeric.quotient(number_moved, time_elapsed)
 
         return raw_rate
 
@@ -214,7 +225,7 @@ class PIPrefetcher(RateBucket):
 
         total = sum([item.raw_demand_rate for item in itertools.islice(
             reversed(usable_demand_rate_log), self.avg_lookback)])
-        return Fraction(total, self.avg_lookback)
+        return self.pipeline.numeric.quotient(total, self.avg_lookback)
 
     def run(self, *args, **kwargs):
         super().run(*args, **kwargs)
@@ -257,8 +268,8 @@ class PIPrefetcher(RateBucket):
                                        prefetch_rate=new_rate))
 
     def reaction(self):
-        if self.pipeline['completed'].info['to_move']:
-            moved = len([io for io in self.pipeline['completed'].info['actual_to_move'] if not
+        if self.completed_bucket.info['to_move']:
+            moved = len([io for io in self.completed_bucket.info['actual_to_move'] if not
                         hasattr(io, 'cached')])
 
             movement = Movement(self.tick, moved)
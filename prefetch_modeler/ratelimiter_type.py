@@ -1,4 +1,5 @@
-from prefetch_modeler.core import RateBucket, Rate, TargetGroupCapacityBucket
+from prefetch_modeler.core import RateBucket, Rate, TargetGroupCapacityBucket, \
+    Peer
 from fractions import Fraction
 import itertools
 import math
@@ -11,6 +12,12 @@ class RateLimiter(TargetGroupCapacityBucket):
     name = 'ratelimiter'
     sinusoid_period = 800
 
+    minimum_latency_bucket = Peer('minimum_latency')
+    inflight_bucket = Peer('inflight')
+    deadline_bucket = Peer('deadline')
+    completed_bucket = Peer('completed')
+    consumed_bucket = Peer('consumed')
+
     def __init__(self, *args, **kwargs):
         self.inflight_scores = {}
         self.latency = 0
@@ -22,9 +29,9 @@ class RateLimiter(TargetGroupCapacityBucket):
 
     @property
     def in_storage(self):
-        return len(self.pipeline['minimum_latency']) + \
-            len(self.pipeline['inflight']) + \
-            len(self.pipeline['deadline'])
+        return len(self.minimum_latency_bucket) + \
+            len(self.inflight_bucket) + \
+            len(self.deadline_bucket)
 
     @property
     def adjustment(self):
@@ -63,7 +70,7 @@ class RateLimiter(TargetGroupCapacityBucket):
         total_latency = 0
         total_contention = 0
 
-        for io in self.pipeline['completed']:
+        for io in self.completed_bucket:
             if hasattr(io, 'cached'):
                 continue
 
@@ -76,7 +83,7 @@ class RateLimiter(TargetGroupCapacityBucket):
 
         # If consumption rate is fast enough, IOs might always be moved to
         # consumed right away, so we need to find them and count them
-        for io in self.pipeline['consumed']:
+        for io in self.consumed_bucket:
             if hasattr(io, 'cached'):
                 continue
 
@@ -1,6 +1,7 @@
 from prefetch_modeler.core import DialBucket, TargetCapacityBucket, \
     ThresholdBucket, GlobalCapacityBucket, Rate, Duration, ContinueBucket, \
     RateBucket, DeadlineBucket
+import math
 
 
 def io_uring(hint,
@@ -97,6 +98,9 @@ def simple_storage2(hint,
         def rate(self):
             return max_iops
 
+        def steady_until(self):
+            return math.inf
+
     class deadline(DeadlineBucket):
         def remove(self, io):
             io.completion_time = self.tick
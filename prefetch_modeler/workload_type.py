@@ -1,5 +1,7 @@
-from prefetch_modeler.core import RateBucket, StopBucket, Rate, Interval
+from prefetch_modeler.core import Bucket, RateBucket, StopBucket, Rate, Interval
+import itertools
 from collections import OrderedDict
+import bisect
 from fractions import Fraction
 import numpy as np
 import math
@@ -27,23 +29,47 @@ class rangerator:
 
 
 class SavedRates:
+    """
+    Rates which hold for consecutive ranges of ticks, ``steps[i]`` ticks long,
+    starting at tick 0. The rates are taken from ``rates`` in turn, repeating
+    them if there are more steps. Outside of the ranges, the rate is
+    ``default_rate``.
+
+    Rates are given per second and rounded up. They are looked up by tick by
+    bisecting the starts of the ranges, and the range found last is tried
+    first since ticks mostly move forwards within one.
+    """
+
     def __init__(self, steps, rates, default_rate=1000):
         self._saved_rates = OrderedDict()
         self.default_rate = default_rate
         self.ranges = rangerator(steps).ranges
         self.rates = rates
 
+        self.starts = [r.start for r in self.ranges]
+        self.rate_values = [
+            Rate(per_second=math.ceil(rates[i % len(rates)])).value
+            for i in range(len(self.ranges))
+        ]
+        self.default_rate_value = Rate(per_second=math.ceil(default_rate)).value
+        self.last_idx = None
+
     def current_range(self, tick):
-        for r in self.ranges:
-            if tick in r:
-                return r
-        return None
+        idx = self.current_range_idx(tick)
+        return None if idx is None else self.ranges[idx]
 
     def current_range_idx(self, tick):
-        for i, r in enumerate(self.ranges):
-            if tick in r:
-                return i
-        return None
+        idx = self.last_idx
+        if idx is not None and tick in self.ranges[idx]:
+            return idx
+
+        # The last range starting at or before the tick. Empty ranges share
+        # their start with the next range and are passed over.
+        idx = bisect.bisect_right(self.starts, tick) - 1
+        if idx < 0 or tick not in self.ranges[idx]:
+            return None
+        self.last_idx = idx
+        return idx
 
     @property
     def saved_rates(self):
@@ -60,10 +86,17 @@ class SavedRates:
         return self._saved_rates
 
     def get_rate(self, tick):
-        for r in self.saved_rates:
-            if tick in r[0]:
-                return Rate(per_second=math.ceil(r[1])).value
-        return Rate(per_second=math.ceil(self.default_rate)).value
+        idx = self.current_range_idx(tick)
+        if idx is None:
+            return self.default_rate_value
+        return self.rate_values[idx]
+
+    def steady_until(self, tick):
+        """The last tick with the same rate as ``tick``."""
+        r = self.current_range(tick)
+        if r is None:
+            return math.inf
+        return r.stop - 1
 
     def next_range_start(self, tick):
         current_range_start = self.current_range_idx(tick)
@@ -100,7 +133,12 @@ class ConsumptionLogEntry:
     prefetch_distance: int
 
 
-def workload_type(hint, consumption_rate_func, saved_rates):
+def workload_type(hint, consumption_rate_func, saved_rates, steady=False):
+    """
+    If ``saved_rates`` is given, ``consumption_rate_func`` should return the
+    saved rate for the tick. Otherwise, ``steady`` says whether it returns the
+    same rate on every tick.
+    """
     class completed(RateBucket):
         def __init__(self, *args, **kwargs):
             self.consumerator = None
@@ -114,6 +152,13 @@ def workload_type(hint, consumption_rate_func, saved_rates):
         def rate(self):
             return consumption_rate_func(self)
 
+        def steady_until(self):
+            if self.saved_rates is not None:
+                return self.saved_rates.steady_until(self.tick)
+            if steady:
+                return math.inf
+            return super().steady_until()
+
         def next_action(self):
             # the lower bound of the next range in the ranges array
             # the min of that and super next_action
@@ -165,7 +210,8 @@ def workload_type(hint, consumption_rate_func, saved_rates):
 def test_consumption_rate(self):
     return Rate(per_second=2000).value
 
-even_wl = workload_type('Even Workload', test_consumption_rate, None)
+even_wl = workload_type('Even Workload', test_consumption_rate, None,
+                        steady=True)
 
 def consumption_rate_func6(self):
     return self.saved_rates.get_rate(getattr(self, 'tick', 0))
@@ -210,3 +256,70 @@ def sinusoid_workload_type(hint, base_rate, amplitude_proportion, period):
             super().add(io)
 
     return [completed, consumed]
+
+
+def replay_workload_type(hint, trace):
+    """
+    Consume IOs at the times recorded in ``trace``, a `BlockTrace`. After
+    consuming an IO, the consumer waits as long as passed between its read and
+    the next one in the trace before consuming again. When it has to wait for
+    an IO to complete, every later IO is consumed that much later.
+    """
+    class completed(Bucket):
+        fifo = True
+        isolated = True
+
+        def __init__(self, *args, **kwargs):
+            self.gaps = None
+            self.gap = 0
+            self.due = 0
+            super().__init__(*args, **kwargs)
+
+        @classmethod
+        def hint(cls):
+            return (1, hint)
+
+        def rate(self):
+            """IOs per tick at the gap before the next IO of the trace."""
+            return Fraction(1, max(self.gap, 1))
+
+        def to_move(self):
+            if self.gaps is None:
+                self.gaps = trace.gaps()
+                # The first IO is due straight away
+                next(self.gaps, None)
+
+            moveable = 0
+            while self.due is not None and self.due <= self.tick and \
+                    moveable < len(self):
+                moveable += 1
+                self.gap = next(self.gaps, None)
+                self.due = None if self.gap is None else self.tick + self.gap
+
+            self.info['want_to_move'] = moveable + self.waiting
+            return tuple(itertools.islice(self.source, moveable))
+
+        def skip(self):
+            super().skip()
+            self.info['want_to_move'] = int(self.waiting)
+
+        @property
+        def waiting(self):
+            """Whether an IO is due which has not completed."""
+            return self.due is not None and self.due <= self.tick
+
+        def next_action(self):
+            if self.due is None or self.waiting:
+                # An IO completing adds it to this bucket, which wakes it
+                return math.inf
+            return self.due
+
+    class consumed(StopBucket):
+        def add(self, io):
+            if getattr(io, "cached", False):
+                return super().add(io)
+            io.consumption_time = self.tick
+            io.processing_time = io.consumption_time - io.submission_time
+            super().add(io)
+
+    return [completed, consumed]
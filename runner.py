@@ -0,0 +1,102 @@
+import importlib.util
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import List
+
+import pandas as pd
+
+from sweep import run_variant
+
+
+def load_definitions(path):
+    """Load a weir input file as a module."""
+    spec = importlib.util.spec_from_file_location('user_defined_stuff', path)
+    module = importlib.util.module_from_spec(spec)
+    # Registered so that the source of classes defined in it can be found
+    sys.modules[spec.name] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+def unique_simulations(groups):
+    """
+    Return the simulations shown by ``groups``, each once, in the order they
+    first appear, mapped to the first group showing them.
+    """
+    simulations = {}
+    for group in groups:
+        simulations.setdefault(id(group.simulation), group)
+    return list(simulations.values())
+
+
+@dataclass(frozen=True)
+class RunSummary:
+    """What a worker process sends back about one simulation run."""
+    recorders: List
+    tracer_data: pd.DataFrame
+    runs: int
+    skipped_runs: int
+
+
+def _run_in_worker(path, index, volume, kwargs):
+    # Classes defined in the input file cannot be pickled, so the worker
+    # loads it again and finds the simulation by its position
+    module = load_definitions(path)
+    simulation = unique_simulations(module.output)[index].simulation
+    result = simulation.run(volume, **kwargs)
+    return RunSummary([metric.recorder for metric in simulation.metrics],
+                      result.tracer_data, result.pipeline.runs,
+                      result.pipeline.skipped_runs)
+
+
+def run_parallel(path, groups, volume, jobs, selected=None, **kwargs):
+    """
+    Run the simulations of ``groups``, loaded from the weir input file at
+    ``path``, in a pool of ``jobs`` processes. Yield each group which first
+    shows a simulation with its `RunSummary` as the runs finish, in order,
+    once the recorded metrics have been restored to the simulation.
+
+    Only the simulations of the groups in ``selected`` are run, if given.
+    """
+    owners = [(index, group)
+              for index, group in enumerate(unique_simulations(groups))
+              if selected is None or group in selected]
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        futures = [pool.submit(_run_in_worker, path, index, volume, kwargs)
+                   for index, _ in owners]
+        for (_, group), future in zip(owners, futures):
+            summary = future.result()
+            for metric, recorder in zip(group.simulation.metrics,
+                                        summary.recorders):
+                metric.restore(recorder)
+            yield group, summary
+
+
+def _run_variant_in_worker(path, index, variant, volume, kwargs):
+    module = load_definitions(path)
+    return run_variant(module.sweeps[index], variant, volume, **kwargs)
+
+
+def run_sweep(path, sweeps, index, volume, jobs=1, **kwargs):
+    """
+    Run every variant of ``sweeps[index]``, loaded from the weir input file
+    at ``path``, and return a DataFrame of their parameters and KPIs with one
+    row per variant.
+    """
+    sweep = sweeps[index]
+    variants = sweep.variants
+
+    if jobs > 1:
+        # Variants are subclasses made at run time, which cannot be pickled,
+        # so workers make them again from the input file
+        with ProcessPoolExecutor(max_workers=jobs) as pool:
+            futures = [pool.submit(_run_variant_in_worker, path, index,
+                                   variant, volume, kwargs)
+                       for variant in variants]
+            kpis = [future.result() for future in futures]
+    else:
+        kpis = [run_variant(sweep, variant, volume, **kwargs)
+                for variant in variants]
+
+    return pd.DataFrame([{**variant, **row} for variant, row in zip(variants, kpis)])
@@ -1,6 +1,7 @@
 from collections.abc import Sequence
 from dataclasses import dataclass
 from periodic_fetcher import ConstantDistancePrefetcher
+from prefetch_modeler.core import Peer
 import itertools
 from numpy import mean
 
@@ -15,6 +16,11 @@ class SimpleFetcher(ConstantDistancePrefetcher):
     hi = 4
     prefetch_distance = lo
 
+    minimum_latency_bucket = Peer('minimum_latency')
+    inflight_bucket = Peer('inflight')
+    deadline_bucket = Peer('deadline')
+    completed_bucket = Peer('completed')
+
     def __init__(self, *args, **kwargs):
         self.consume_log = []
         self.tput_denom = 100000
@@ -30,7 +36,7 @@ class SimpleFetcher(ConstantDistancePrefetcher):
 
     @property
     def completed(self):
-        return len(self.pipeline['completed'])
+        return len(self.completed_bucket)
 
     @property
     def completion_rate(self):
@@ -53,9 +59,9 @@ class SimpleFetcher(ConstantDistancePrefetcher):
 
     @property
     def in_storage(self):
-        return len(self.pipeline['minimum_latency']) + \
-            len(self.pipeline['inflight']) + \
-            len(self.pipeline['deadline'])
+        return len(self.minimum_latency_bucket) + \
+            len(self.inflight_bucket) + \
+            len(self.deadline_bucket)
 
     @property
     def change(self):
@@ -77,10 +83,10 @@ class SimpleFetcher(ConstantDistancePrefetcher):
             self.prefetch_distance = max(1, self.prefetch_distance - self.change)
 
     def reaction(self):
-        for io in self.pipeline['completed'].info['actual_to_move']:
+        for io in self.completed_bucket.info['actual_to_move']:
             self.on_consume(io)
 
-        for io in itertools.chain(self.pipeline['completed'], self.pipeline['completed']):
+        for io in itertools.chain(self.completed_bucket, self.completed_bucket):
             # Ensure that we don't account an IO more than once
             if getattr(io, "accounted", None) is not None:
                 continue
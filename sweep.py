@@ -0,0 +1,123 @@
+import itertools
+import random
+
+from prefetch_modeler.core import Simulation
+from metric import in_storage
+
+
+class Sweep:
+    """
+    Variants of a simulation with class attributes of its bucket types
+    changed.
+
+    ``parameters`` maps names of the form ``'ClassName.attribute'`` to the
+    values to try. By default every combination of values is run. Given
+    ``samples``, that many combinations are instead chosen at random.
+
+    ```
+    sweep = Sweep(simulation_simple, {'SimpleFetcher.lo': [1, 2, 4],
+                                      'SimpleFetcher.hi': [4, 8, 16]})
+    ```
+    """
+
+    def __init__(self, simulation, parameters, samples=None, seed=0):
+        self.simulation = simulation
+        self.parameters = parameters
+        self.samples = samples
+        self.seed = seed
+
+        bucket_types = {bucket_type.__name__ for bucket_type in simulation.schema}
+        for name in parameters:
+            class_name, _, attr_name = name.partition('.')
+            if class_name not in bucket_types:
+                raise ValueError(f'Sweep parameter {name!r} does not name a '
+                                 f'bucket type of the simulation')
+            bucket_type = self._bucket_type(class_name)
+            if not hasattr(bucket_type, attr_name):
+                raise ValueError(f'{class_name} has no attribute {attr_name!r}')
+
+    def _bucket_type(self, class_name):
+        for bucket_type in self.simulation.schema:
+            if bucket_type.__name__ == class_name:
+                return bucket_type
+
+    @property
+    def variants(self):
+        """A list of dicts of parameter name to value, one per variant."""
+        names = list(self.parameters)
+        if self.samples is None:
+            combinations = itertools.product(*self.parameters.values())
+        else:
+            rng = random.Random(self.seed)
+            combinations = (
+                [rng.choice(list(values)) for values in self.parameters.values()]
+                for _ in range(self.samples)
+            )
+        return [dict(zip(names, values)) for values in combinations]
+
+    def simulation_for(self, variant):
+        """A simulation whose bucket types are subclasses with the attributes
+        of ``variant`` set."""
+        attributes = {}
+        for name, value in variant.items():
+            class_name, _, attr_name = name.partition('.')
+            attributes.setdefault(class_name, {})[attr_name] = value
+
+        schema = []
+        for bucket_type in self.simulation.schema:
+            if bucket_type.__name__ in attributes:
+                bucket_type = type(bucket_type.__name__, (bucket_type,),
+                                   attributes[bucket_type.__name__])
+            schema.append(bucket_type)
+        return Simulation(*schema, cache=self.simulation.cache,
+                          blocks=self.simulation.blocks)
+
+
+class KPIs:
+    """
+    Summarises a run of a simulation when attached to it like a `Metric`:
+
+    - completion_tick: the last tick of the run
+    - consumer_wait: the ticks during which the consumer wanted to consume
+      more IOs than had completed
+    - mean_in_storage: the number of IOs in storage, averaged over time
+    """
+
+    def __init__(self):
+        self.last_tick = 0
+        self.waiting = False
+        self.in_storage = 0
+        self.consumer_wait = 0
+        self.in_storage_ticks = 0
+
+    def run(self, pipeline):
+        elapsed = pipeline.tick - self.last_tick
+        if self.waiting:
+            self.consumer_wait += elapsed
+        self.in_storage_ticks += self.in_storage * elapsed
+        self.last_tick = pipeline.tick
+
+        info = pipeline['completed'].info
+        self.waiting = info.get('want_to_move', 0) > info.get('to_move', 0)
+        self.in_storage = in_storage.value(pipeline)
+
+    def finish(self):
+        pass
+
+    @property
+    def data(self):
+        return {
+            'completion_tick': self.last_tick,
+            'consumer_wait': self.consumer_wait,
+            'mean_in_storage': self.in_storage_ticks / self.last_tick
+                if self.last_tick else None,
+        }
+
+
+def run_variant(sweep, variant, volume, **kwargs):
+    """Run one variant of ``sweep`` and return its KPIs."""
+    simulation = sweep.simulation_for(variant)
+    kpis = KPIs()
+    simulation.metrics.append(kpis)
+    simulation.run(volume, **kwargs)
+    return kpis.data